@@ -0,0 +1,50 @@
+"""posts.user_id on delete cascade
+
+Revision ID: 5f3a9c2e7b14
+Revises: 228b7263cbaf
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f3a9c2e7b14'
+down_revision: Union[str, Sequence[str], None] = '228b7263cbaf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Имя внешнего ключа задано явно и в модели (alembic_example.Post)
+FK_NAME = 'posts_user_id_fkey'
+
+
+def _user_id_foreign_keys():
+    """Имена внешних ключей posts.user_id: таблицы создавались create_all, имя не гарантировано"""
+    inspector = sa.inspect(op.get_bind())
+    return [
+        fk['name'] for fk in inspector.get_foreign_keys('posts')
+        if fk['constrained_columns'] == ['user_id'] and fk['name']
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Посты удаляет сама БД при удалении пользователя; индекс по user_id
+    # нужен, чтобы каскад не сканировал posts целиком на каждого пользователя
+    for name in _user_id_foreign_keys():
+        op.drop_constraint(name, 'posts', type_='foreignkey')
+    op.create_foreign_key(FK_NAME, 'posts', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+    # create_all с актуальной моделью (index=True) мог уже создать индекс
+    op.create_index('ix_posts_user_id', 'posts', ['user_id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_user_id', table_name='posts', if_exists=True)
+    for name in _user_id_foreign_keys():
+        op.drop_constraint(name, 'posts', type_='foreignkey')
+    op.create_foreign_key(FK_NAME, 'posts', 'users', ['user_id'], ['id'])
@@ -0,0 +1,31 @@
+"""add task updated_at and user tasks_version
+
+Revision ID: 8c1d4e7f2a90
+Revises: 56eaf2275679
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1d4e7f2a90'
+down_revision: Union[str, Sequence[str], None] = '56eaf2275679'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE tasks SET updated_at = created_at')
+    op.add_column('users', sa.Column('tasks_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'tasks_version')
+    op.drop_column('tasks', 'updated_at')
@@ -0,0 +1,149 @@
+"""partition tasks by created_at month
+
+Revision ID: b7e2f4a91c3d
+Revises: 8c1d4e7f2a90
+Create Date: 2026-10-19 14:05:12.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f4a91c3d'
+down_revision: Union[str, Sequence[str], None] = '8c1d4e7f2a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Партиции на месяцы вперёд; дальше их создаёт app.partitions (старт приложения / cron)
+MONTHS_AHEAD = 3
+
+TASK_COLUMNS = "id, title, description, status, owner_id, created_at, updated_at"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Старая таблица остаётся под другим именем до переноса строк
+    op.execute('ALTER TABLE tasks RENAME TO tasks_heap')
+    op.execute('ALTER INDEX ix_tasks_id RENAME TO ix_tasks_heap_id')
+    op.execute('ALTER TABLE tasks_heap RENAME CONSTRAINT tasks_pkey TO tasks_heap_pkey')
+
+    # Ключ партиционирования обязан входить в первичный ключ
+    op.execute("""
+        CREATE TABLE tasks (
+            id integer NOT NULL DEFAULT nextval('tasks_id_seq'),
+            title varchar NOT NULL,
+            description varchar,
+            status varchar,
+            owner_id integer REFERENCES users (id),
+            created_at timestamp NOT NULL DEFAULT now(),
+            updated_at timestamp,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    # Индексы на партиционированной таблице создаются в каждой партиции
+    op.create_index('ix_tasks_id', 'tasks', ['id'])
+    op.create_index('ix_tasks_owner_id_created_at', 'tasks', ['owner_id', 'created_at'])
+    # Строки вне созданных месячных партиций (пропущенное обслуживание)
+    op.execute('CREATE TABLE tasks_default PARTITION OF tasks DEFAULT')
+
+    # Месячные партиции от самой старой задачи до MONTHS_AHEAD месяцев вперёд
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month date;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', coalesce((SELECT min(created_at) FROM tasks_heap), now())),
+                    date_trunc('month', now()) + interval '{MONTHS_AHEAD} months',
+                    interval '1 month'
+                )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF tasks FOR VALUES FROM (%L) TO (%L)',
+                    'tasks_p' || to_char(month, 'YYYYMM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+            END LOOP;
+        END $$
+    """)
+
+    op.execute(f"""
+        INSERT INTO tasks ({TASK_COLUMNS})
+        SELECT id, title, description, status, owner_id, coalesce(created_at, now()), updated_at
+        FROM tasks_heap
+    """)
+    op.execute('ALTER SEQUENCE tasks_id_seq OWNED BY tasks.id')
+    op.drop_table('tasks_heap')
+
+    # Первичный ключ теперь (id, created_at) и уникальность id сам не гарантирует,
+    # а на id ссылаются tasks_archive и ON CONFLICT в bulk_load. Выданные id
+    # хранятся в task_ids и не освобождаются: id удалённой или перенесённой в архив
+    # задачи повторно не выдаётся (иначе он оказался бы и в tasks, и в tasks_archive),
+    # а DELETE и DETACH партиции ведут себя одинаково. Дубликат id - unique_violation.
+    # Триггеры уровня оператора с таблицами переходов: перенос строки между
+    # партициями (смена created_at) виден как UPDATE с тем же id, а не как
+    # DELETE + INSERT. Запись прямо в партицию их не вызывает - пишем только в tasks
+    op.execute('CREATE TABLE task_ids (id integer PRIMARY KEY)')
+    op.execute('INSERT INTO task_ids (id) SELECT id FROM tasks')
+    op.execute("""
+        CREATE FUNCTION tasks_claim_ids() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO task_ids (id) SELECT id FROM new_rows;
+            RETURN NULL;
+        END $$
+    """)
+    op.execute("""
+        CREATE FUNCTION tasks_claim_changed_ids() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            -- Новые id занимаются, прежние остаются занятыми
+            INSERT INTO task_ids (id)
+            SELECT id FROM new_rows WHERE id NOT IN (SELECT id FROM old_rows);
+            -- Две строки оператора получили один id
+            IF EXISTS (SELECT 1 FROM new_rows GROUP BY id HAVING count(*) > 1) THEN
+                RAISE unique_violation USING MESSAGE = 'duplicate task id';
+            END IF;
+            RETURN NULL;
+        END $$
+    """)
+    op.execute(
+        'CREATE TRIGGER tasks_claim_ids AFTER INSERT ON tasks REFERENCING NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION tasks_claim_ids()'
+    )
+    # Столбцы (UPDATE OF id) с таблицами переходов не указываются
+    op.execute(
+        'CREATE TRIGGER tasks_claim_changed_ids AFTER UPDATE ON tasks '
+        'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION tasks_claim_changed_ids()'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER tasks_claim_changed_ids ON tasks')
+    op.execute('DROP TRIGGER tasks_claim_ids ON tasks')
+    op.execute('DROP FUNCTION tasks_claim_changed_ids()')
+    op.execute('DROP FUNCTION tasks_claim_ids()')
+    op.drop_table('task_ids')
+    op.execute('ALTER TABLE tasks RENAME TO tasks_partitioned')
+    op.execute('ALTER INDEX ix_tasks_id RENAME TO ix_tasks_partitioned_id')
+    op.create_table('tasks',
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('tasks_id_seq')"), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tasks_id', 'tasks', ['id'])
+    op.execute(f'INSERT INTO tasks ({TASK_COLUMNS}) SELECT {TASK_COLUMNS} FROM tasks_partitioned')
+    op.execute('ALTER SEQUENCE tasks_id_seq OWNED BY tasks.id')
+    # Вместе с партициями (включая tasks_default)
+    op.execute('DROP TABLE tasks_partitioned')
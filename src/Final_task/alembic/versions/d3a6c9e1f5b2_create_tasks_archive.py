@@ -0,0 +1,45 @@
+"""create tasks_archive
+
+Revision ID: d3a6c9e1f5b2
+Revises: b7e2f4a91c3d
+Create Date: 2026-10-19 16:40:27.118952
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a6c9e1f5b2'
+down_revision: Union[str, Sequence[str], None] = 'b7e2f4a91c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # id переносится из tasks как есть (без своей последовательности)
+    op.create_table('tasks_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tasks_archive_owner_id'), 'tasks_archive', ['owner_id'], unique=False)
+    # Поиск кандидатов в архив: выполненные задачи по времени изменения
+    op.create_index('ix_tasks_status_updated_at', 'tasks', ['status', 'updated_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_status_updated_at', table_name='tasks')
+    op.drop_index(op.f('ix_tasks_archive_owner_id'), table_name='tasks_archive')
+    op.drop_table('tasks_archive')
@@ -0,0 +1,37 @@
+"""create tasks_versions
+
+Revision ID: e4c7a2d9b8f1
+Revises: d3a6c9e1f5b2
+Create Date: 2026-10-19 18:12:44.305861
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4c7a2d9b8f1'
+down_revision: Union[str, Sequence[str], None] = 'd3a6c9e1f5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tasks_versions',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Старт выше прежней суммы счётчиков пользователей: выданные по ней ETag не совпадут
+    op.execute(
+        'INSERT INTO tasks_versions (id, version) '
+        'SELECT 1, coalesce(sum(tasks_version), 0) + 1 FROM users'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('tasks_versions')
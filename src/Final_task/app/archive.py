@@ -0,0 +1,112 @@
+"""
+Архив выполненных задач: tasks (горячая таблица) -> tasks_archive.
+
+Задачи со статусом done, не менявшиеся older_than_days дней, переносятся
+пачками по batch_size: каждая пачка - короткая транзакция (INSERT ... SELECT
+и DELETE по id), блокировки держатся только на строках пачки.
+
+CLI (из src/Final_task, для cron):
+    python -m app.archive --days 30 --batch-size 1000
+"""
+import argparse
+import asyncio
+import logging
+import time
+import anyio.to_thread
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from .models import Task, TaskArchive, TaskStatus
+from .crud import bump_tasks_versions
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_COLUMNS = ("id", "title", "description", "status", "owner_id", "created_at", "updated_at")
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """Переносит одну пачку и коммитит; возвращает число перенесённых задач"""
+    modified_at = func.coalesce(Task.updated_at, Task.created_at)
+    rows = db.execute(
+        select(Task.id, Task.owner_id)
+        .where(Task.status == TaskStatus.done, modified_at < cutoff)
+        .order_by(Task.id)
+        .limit(batch_size)
+        # Параллельные архиваторы не ждут друг друга (в PostgreSQL)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        db.rollback()
+        return 0
+
+    ids = [row.id for row in rows]
+    db.execute(
+        insert(TaskArchive).from_select(
+            ARCHIVED_COLUMNS,
+            select(*(getattr(Task, column) for column in ARCHIVED_COLUMNS)).where(Task.id.in_(ids)),
+        )
+    )
+    db.execute(delete(Task).where(Task.id.in_(ids)))
+    # Списки задач владельцев изменились - их ETag должен смениться
+    bump_tasks_versions(db, [row.owner_id for row in rows])
+    db.commit()
+    return len(ids)
+
+
+def archive_done_tasks(db: Session, older_than_days: int, batch_size: int = 1000,
+                       pause: float = 0.0, max_batches: int = None) -> int:
+    """Переносит все подходящие задачи; pause - пауза между пачками для снижения нагрузки"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(db, cutoff, batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+async def run_archiver(session_factory, older_than_days: int, batch_size: int, interval: float):
+    """Фоновый архиватор (задача в lifespan приложения): проход раз в interval секунд"""
+
+    def archive_once():
+        db = session_factory()
+        try:
+            return archive_done_tasks(db, older_than_days, batch_size)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            moved = await anyio.to_thread.run_sync(archive_once)
+            if moved:
+                logger.info("в архив перенесено %s задач", moved)
+        except Exception:
+            logger.exception("ошибка архивации задач")
+        await asyncio.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перенос выполненных задач в tasks_archive")
+    parser.add_argument("--days", type=int, default=30, help="не менялись дольше N дней")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="пауза между пачками, сек")
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        moved = archive_done_tasks(db, args.days, args.batch_size, args.pause)
+        print(f"в архив перенесено {moved} задач за {time.perf_counter() - started:.1f} с")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import zlib
+from typing import Iterable, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость, без неё только gzip
+    brotli = None
+
+DEFAULT_COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "image/svg+xml",
+    "text/",
+)
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def process(self, data: bytes) -> bytes:
+        # SYNC_FLUSH - клиент получает данные сразу, не дожидаясь конца потока
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _quality(params) -> float:
+    """q из параметров элемента Accept-Encoding (RFC 9110): q=0 - отказ; без q - 1"""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value.strip())
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов gzip / brotli:
+    - только для типов из compressible_types (PNG и прочие сжатые форматы пропускаются)
+    - ответы меньше minimum_size отдаются как есть
+    - тела StreamingResponse сжимаются потоково, по мере отдачи чанков
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        compressible_types: Iterable[str] = DEFAULT_COMPRESSIBLE_TYPES,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        use_brotli: bool = True,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressible_types = tuple(compressible_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.use_brotli = use_brotli and brotli is not None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def select_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = set()
+        for item in accept_encoding.split(","):
+            coding, *params = item.split(";")
+            if _quality(params) > 0:
+                accepted.add(coding.strip().lower())
+        if self.use_brotli and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def is_compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type.startswith(self.compressible_types)
+
+    def create_encoder(self, encoding: str):
+        if encoding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Optional[Message] = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_length = headers.get("content-length")
+            self.passthrough = not self.middleware.is_compressible(headers) or (
+                content_length is not None
+                and int(content_length) < self.middleware.minimum_size
+            )
+            if self.passthrough:
+                await self.downstream(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            # Тело целиком в одном сообщении и меньше порога - отдаём без сжатия
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.downstream(self.start_message)
+                await self.downstream(message)
+                return
+            self.encoder = self.middleware.create_encoder(self.encoding)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                compressed = self.encoder.process(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self.downstream(self.start_message)
+                await self.downstream({**message, "body": compressed})
+                return
+            # Потоковый ответ: длина заранее неизвестна
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self.downstream(self.start_message)
+
+        chunk = self.encoder.process(body)
+        if not more_body:
+            chunk += self.encoder.finish()
+        await self.downstream(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
@@ -0,0 +1,60 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Слабый ETag из частей версии (тело зависит от сжатия, поэтому W/)"""
+    digest = hashlib.blake2b(
+        ":".join(str(part) for part in parts).encode(), digest_size=8
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    """datetime (UTC, naive) -> формат заголовка Last-Modified"""
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Слабое сравнение: W/"x" и "x" совпадают
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """If-None-Match имеет приоритет над If-Modified-Since (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+        return modified <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
@@ -1,10 +1,39 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import List, Optional
+from .compression import DEFAULT_COMPRESSIBLE_TYPES
 
 class Settings(BaseSettings):
     database_url: str
     secret_key: str
     access_token_expire_minutes: int = 30
+    # Стоимость bcrypt (2^rounds итераций); в тестах 4 - минимум bcrypt
+    bcrypt_rounds: int = 12
+    orjson_responses: bool = True
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_types: List[str] = list(DEFAULT_COMPRESSIBLE_TYPES)
+    compression_brotli: bool = True
+    png_optimize: bool = False
+    sql_profiling: bool = False
+    metrics_enabled: bool = True
+    # Пул соединений SQLAlchemy (для SQLite не применяется); -1 - без ограничения overflow
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    redis_url: Optional[str] = None
+    readiness_timeout: float = 1.0
+    readiness_cache_seconds: float = 2.0
+    lazy_load_threshold: Optional[int] = None
+    lazy_load_raise: bool = False
+    mongo_url: Optional[str] = None
+    mongo_db: str = "customer"
+    mongo_reviews_collection: str = "reviews"
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_timeout_ms: int = 2000
+    partitions_months_ahead: int = 3
+    archive_after_days: Optional[int] = None
+    archive_batch_size: int = 1000
+    archive_interval_seconds: float = 3600.0
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -1,9 +1,14 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, select, union_all, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional
-from .models import Task, User
+from typing import List, Optional, Sequence
+from datetime import datetime
+from .models import Task, TaskArchive, TasksVersion, User, TaskStatus
 from .schemas import TaskCreate, TaskUpdate
 
+# id единственной строки tasks_versions
+GLOBAL_VERSION_ID = 1
+
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
@@ -13,32 +18,160 @@ def create_user(db: Session, user: User):
     db.refresh(user)
     return user
 
-def get_tasks(db: Session, skip: int = 0, limit: int = 100, status: Optional[str] = None, owner_id: Optional[int] = None) -> List[Task]:
-    query = db.query(Task)
+def _task_filters(model, status, owner_id, date_from, date_to) -> list:
+    filters = []
     if status:
-        query = query.filter(Task.status == status)
+        filters.append(model.status == status)
+    if owner_id:
+        filters.append(model.owner_id == owner_id)
+    # Фильтр по created_at отсекает месячные партиции tasks (partition pruning),
+    # owner_id использует индекс (owner_id, created_at) в каждой партиции
+    if date_from:
+        filters.append(model.created_at >= date_from)
+    if date_to:
+        filters.append(model.created_at < date_to)
+    return filters
+
+def tasks_source(columns: Sequence[str], filters=None, include_archived: bool = True):
+    """
+    Подзапрос задач с колонками columns: горячая таблица и при include_archived
+    архив выполненных (tasks_archive) через UNION ALL, иначе итоги уменьшаются
+    по мере архивации. filters(model) - условия WHERE, применяются к каждой
+    таблице до объединения (индексы и отсечение партиций работают)
+    """
+    models = (Task, TaskArchive) if include_archived else (Task,)
+    queries = [
+        select(*[getattr(model, name) for name in columns]).where(*(filters(model) if filters else ()))
+        for model in models
+    ]
+    return (union_all(*queries) if len(queries) > 1 else queries[0]).subquery()
+
+def get_tasks(db: Session, skip: int = 0, limit: int = 100, status: Optional[str] = None, owner_id: Optional[int] = None, with_owner: bool = False, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None, include_archived: bool = False) -> List[Task]:
+    """Задачи по id - с архивом и без него одинаково, страницы skip/limit стабильны"""
+    if include_archived:
+        # Строки UNION ALL - не объекты Task, связи owner у них нет
+        if with_owner:
+            raise ValueError("with_owner не поддерживается вместе с include_archived")
+        return get_tasks_with_archive(db, skip, limit, status, owner_id, date_from, date_to)
+    query = db.query(Task).filter(*_task_filters(Task, status, owner_id, date_from, date_to))
+    if with_owner:
+        # Владелец в том же запросе (JOIN), task.owner без запроса на строку
+        query = query.options(joinedload(Task.owner))
+    return query.order_by(Task.id).offset(skip).limit(limit).all()
+
+def get_tasks_with_archive(db: Session, skip: int = 0, limit: int = 100, status: Optional[str] = None, owner_id: Optional[int] = None, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> list:
+    """Горячие и архивные задачи одним UNION ALL (строки с полями схемы Task, по id)"""
+    def columns(model):
+        return select(
+            model.id, model.title, model.description, model.status,
+            model.owner_id, model.created_at, model.updated_at,
+        ).where(*_task_filters(model, status, owner_id, date_from, date_to))
+
+    tasks = union_all(columns(Task), columns(TaskArchive)).subquery()
+    return db.execute(
+        select(tasks).order_by(tasks.c.id).offset(skip).limit(limit)
+    ).all()
+
+def bump_tasks_versions(db, owner_ids):
+    """
+    Увеличивает счётчики изменений задач владельцев (одним UPDATE) и общий счётчик
+    (в текущей транзакции); db - Session или Connection
+    """
+    owner_ids = {owner_id for owner_id in owner_ids if owner_id is not None}
+    if owner_ids:
+        users = User.__table__
+        db.execute(
+            update(users).where(users.c.id.in_(owner_ids)).values(tasks_version=users.c.tasks_version + 1)
+        )
+    versions = TasksVersion.__table__
+    db.execute(
+        update(versions).where(versions.c.id == GLOBAL_VERSION_ID).values(version=versions.c.version + 1)
+    )
+
+def bump_tasks_version(db: Session, owner_id: Optional[int]):
+    """Увеличивает счётчик изменений задач владельца и общий (в текущей транзакции)"""
+    bump_tasks_versions(db, [owner_id])
+
+def get_tasks_version(db: Session, owner_id: Optional[int] = None) -> int:
+    """Версия списка задач: счётчик владельца или общий счётчик (tasks_versions)"""
     if owner_id:
-        query = query.filter(Task.owner_id == owner_id)
-    return query.offset(skip).limit(limit).all()
+        version = db.query(User.tasks_version).filter(User.id == owner_id).scalar()
+    else:
+        version = db.query(TasksVersion.version).filter(TasksVersion.id == GLOBAL_VERSION_ID).scalar()
+    return version or 0
+
+def get_task_meta(db: Session, task_id: int):
+    """owner_id и время изменения задачи без загрузки всей строки (с учётом архива)"""
+    for model in (Task, TaskArchive):
+        meta = (
+            db.query(
+                model.owner_id,
+                func.coalesce(model.updated_at, model.created_at).label("modified_at"),
+            )
+            .filter(model.id == task_id)
+            .first()
+        )
+        if meta:
+            return meta
+    return None
 
 def create_task(db: Session, task: TaskCreate, owner_id: int):
     db_task = Task(**task.dict(), owner_id=owner_id)
     db.add(db_task)
+    bump_tasks_version(db, owner_id)
     db.commit()
     db.refresh(db_task)
     return db_task
 
-def get_task(db: Session, task_id: int):
-    return db.query(Task).filter(Task.id == task_id).first()
+def get_task(db: Session, task_id: int, with_owner: bool = False):
+    query = db.query(Task)
+    if with_owner:
+        query = query.options(joinedload(Task.owner))
+    return query.filter(Task.id == task_id).first()
+
+def get_archived_task(db: Session, task_id: int):
+    return db.query(TaskArchive).filter(TaskArchive.id == task_id).first()
+
+def get_users_with_tasks(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
+    """Пользователи с задачами: второй запрос WHERE owner_id IN (...) вместо запроса на каждого"""
+    return (
+        db.query(User)
+        .options(selectinload(User.tasks))
+        .order_by(User.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 def update_task(db: Session, task: Task, task_update: TaskUpdate):
     update_data = task_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(task, field, value)
+    task.updated_at = datetime.utcnow()
+    bump_tasks_version(db, task.owner_id)
     db.commit()
     db.refresh(task)
     return task
 
 def delete_task(db: Session, db_task: Task):
     db.delete(db_task)
+    bump_tasks_version(db, db_task.owner_id)
     db.commit()
+
+def count_tasks_by_status(db: Session, owner_id: Optional[int] = None, include_archived: bool = True) -> dict:
+    """Количество задач по статусам одним GROUP BY, без загрузки строк (по умолчанию вместе с архивом)"""
+    tasks = tasks_source(
+        ("status",), lambda model: [model.owner_id == owner_id] if owner_id else [], include_archived
+    )
+    rows = db.execute(select(tasks.c.status, func.count()).group_by(tasks.c.status)).all()
+    return {status.value: count for status, count in rows}
+
+def count_tasks_by_user(db: Session, status: TaskStatus) -> List[tuple]:
+    """Количество задач со статусом по каждому пользователю (включая пользователей без задач)"""
+    return (
+        db.query(User.username, func.count(Task.id))
+        .outerjoin(Task, and_(Task.owner_id == User.id, Task.status == status))
+        .group_by(User.id, User.username)
+        .order_by(User.id)
+        .all()
+    )
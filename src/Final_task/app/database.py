@@ -2,11 +2,28 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from .config import settings
+from .profiling import install_sql_profiling
+from .nplusone import install_lazy_load_detector
 
-engine = create_engine(settings.database_url)
+# Размеры пула заданы явно: по ним же /health/ready считает загрузку пула
+pool_options = (
+    {}
+    if settings.database_url.startswith("sqlite")
+    else {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
+)
+engine = create_engine(settings.database_url, **pool_options)
+install_sql_profiling(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if settings.lazy_load_threshold is not None:
+    install_lazy_load_detector(
+        SessionLocal, settings.lazy_load_threshold, raise_error=settings.lazy_load_raise
+    )
 Base = declarative_base()
 
+def get_session_factory():
+    """Фабрика сессий для кода, который сам открывает и закрывает сессию (потоковые ответы)"""
+    return SessionLocal
+
 def get_db():
     db = SessionLocal()
     try:
@@ -0,0 +1,235 @@
+"""
+Колоночная выгрузка задач в Arrow IPC / Parquet.
+
+Задачи читаются пачками через server-side курсор и записываются
+по одной пачке (record batch / row group) за раз, статус хранится
+как dictionary-колонка.
+
+CLI (из src/Final_task):
+    python -m app.export --format parquet --output tasks.parquet --with-usernames
+"""
+import argparse
+import io
+import sys
+from datetime import datetime
+from typing import Iterator, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import String, select, type_coerce
+from sqlalchemy.orm import Session, sessionmaker
+from .database import SessionLocal
+from .models import User
+from .crud import tasks_source
+from .loaders import status_categorical, DEFAULT_CHUNK_SIZE
+
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+STATUS_TYPE = pa.dictionary(pa.int8(), pa.string())
+
+TASK_FIELDS = [
+    pa.field("id", pa.int64(), nullable=False),
+    pa.field("title", pa.string()),
+    pa.field("status", STATUS_TYPE),
+    pa.field("created_at", pa.timestamp("us")),
+    pa.field("owner_id", pa.int64()),
+]
+USERNAME_FIELD = pa.field("username", pa.string())
+
+
+def export_schema(with_usernames: bool = False) -> pa.Schema:
+    fields = TASK_FIELDS + [USERNAME_FIELD] if with_usernames else TASK_FIELDS
+    return pa.schema(fields)
+
+
+def build_export_query(
+    owner_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    with_usernames: bool = False,
+    include_archived: bool = True,
+):
+    """
+    SELECT для выгрузки; статус читается как строка (имя члена Enum) без конвертации.
+    Вместе с архивом (tasks_archive), include_archived=False - только горячие задачи
+    """
+
+    def filters(model):
+        conditions = []
+        if owner_id is not None:
+            conditions.append(model.owner_id == owner_id)
+        if date_from is not None:
+            conditions.append(model.created_at >= date_from)
+        if date_to is not None:
+            conditions.append(model.created_at < date_to)
+        return conditions
+
+    tasks = tasks_source(("id", "title", "status", "created_at", "owner_id"), filters, include_archived)
+    columns = [
+        tasks.c.id,
+        tasks.c.title,
+        type_coerce(tasks.c.status, String).label("status"),
+        tasks.c.created_at,
+        tasks.c.owner_id,
+    ]
+    if with_usernames:
+        columns.append(User.username)
+    query = select(*columns)
+    if with_usernames:
+        query = query.outerjoin(User, tasks.c.owner_id == User.id)
+    return query.order_by(tasks.c.id)
+
+
+def iter_task_batches(
+    db: Session,
+    owner_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    with_usernames: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    include_archived: bool = True,
+) -> Iterator[pa.RecordBatch]:
+    """Отдаёт задачи пачками RecordBatch, читая их server-side курсором"""
+    schema = export_schema(with_usernames)
+    query = build_export_query(owner_id, date_from, date_to, with_usernames, include_archived)
+    result = db.connection().execute(
+        query, execution_options={"stream_results": True, "yield_per": chunk_size}
+    )
+    try:
+        for rows in result.partitions():
+            columns = list(zip(*rows))
+            arrays = [
+                pa.array(columns[0], type=pa.int64()),
+                pa.array(columns[1], type=pa.string()),
+                pa.array(status_categorical(columns[2]), type=STATUS_TYPE),
+                pa.array(columns[3], type=pa.timestamp("us")),
+                pa.array(columns[4], type=pa.int64()),
+            ]
+            if with_usernames:
+                arrays.append(pa.array(columns[5], type=pa.string()))
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+    finally:
+        result.close()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файлоподобный приёмник: копит записанные байты до вызова drain()"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _open_writer(sink, fmt: str, schema: pa.Schema):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    if fmt == "arrow":
+        return pa.ipc.new_stream(
+            sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")
+        )
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def write_batches(sink, batches, fmt: str, schema: pa.Schema) -> int:
+    """Записывает пачки в файл/поток; каждая пачка - отдельная row group. Возвращает число строк"""
+    total = 0
+    writer = _open_writer(sink, fmt, schema)
+    try:
+        for batch in batches:
+            if batch.num_rows:
+                writer.write_batch(batch)
+                total += batch.num_rows
+    finally:
+        writer.close()
+    return total
+
+
+def stream_export(batches, fmt: str, schema: pa.Schema) -> Iterator[bytes]:
+    """Генератор байтов для StreamingResponse: отдаёт данные после каждой пачки"""
+    sink = _ChunkSink()
+    writer = _open_writer(sink, fmt, schema)
+    try:
+        for batch in batches:
+            if batch.num_rows:
+                writer.write_batch(batch)
+                data = sink.drain()
+                if data:
+                    yield data
+    finally:
+        writer.close()
+    # Хвост формата (footer Parquet / конец IPC stream); пустой кусок не отдаём
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def stream_task_export(session_factory: sessionmaker, fmt: str, with_usernames: bool = False,
+                       **filters) -> Iterator[bytes]:
+    """
+    stream_export со своей сессией: StreamingResponse читает генератор уже после
+    закрытия сессии запроса (get_db), поэтому курсор живёт в отдельной сессии,
+    которую генератор закрывает сам - и при обрыве соединения клиентом
+    """
+    db = session_factory()
+    try:
+        batches = iter_task_batches(db, with_usernames=with_usernames, **filters)
+        yield from stream_export(batches, fmt, export_schema(with_usernames))
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Выгрузка задач в Arrow IPC / Parquet")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--output", required=True, help="путь к файлу или '-' для stdout")
+    parser.add_argument("--owner-id", type=int)
+    parser.add_argument("--date-from", type=datetime.fromisoformat)
+    parser.add_argument("--date-to", type=datetime.fromisoformat)
+    parser.add_argument("--with-usernames", action="store_true")
+    parser.add_argument("--without-archived", action="store_true", help="без задач из tasks_archive")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        batches = iter_task_batches(
+            db,
+            owner_id=args.owner_id,
+            date_from=args.date_from,
+            date_to=args.date_to,
+            with_usernames=args.with_usernames,
+            chunk_size=args.chunk_size,
+            include_archived=not args.without_archived,
+        )
+        schema = export_schema(args.with_usernames)
+        if args.output == "-":
+            total = write_batches(sys.stdout.buffer, batches, args.format, schema)
+        else:
+            with open(args.output, "wb") as sink:
+                total = write_batches(sink, batches, args.format, schema)
+    finally:
+        db.close()
+    print(f"Exported {total} tasks", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
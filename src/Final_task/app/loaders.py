@@ -0,0 +1,105 @@
+from typing import Optional, Sequence
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .models import TaskStatus
+from .crud import tasks_source
+
+# В БД Enum хранится по имени члена ("in_progress"), наружу отдаём значение ("in progress")
+STATUS_NAMES = [status.name for status in TaskStatus]
+STATUS_VALUES = [status.value for status in TaskStatus]
+
+TASK_COLUMNS = ("id", "title", "status", "created_at", "owner_id")
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def build_tasks_query(
+    owner_id: Optional[int] = None,
+    status: Optional[str] = None,
+    columns: Sequence[str] = TASK_COLUMNS,
+    include_archived: bool = True,
+):
+    """SELECT только нужных колонок задач без построения ORM-объектов"""
+
+    def filters(model):
+        conditions = []
+        if owner_id is not None:
+            conditions.append(model.owner_id == owner_id)
+        if status:
+            conditions.append(model.status == status)
+        return conditions
+
+    tasks = tasks_source(tuple(dict.fromkeys(("id", *columns))), filters, include_archived)
+    return select(*[tasks.c[name] for name in columns]).order_by(tasks.c.id)
+
+
+def fetch_columns(cursor, n_columns: int, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Читает кортежи напрямую из DBAPI курсора пачками по chunk_size
+    и транспонирует их в списки по колонкам
+    """
+    columns = [[] for _ in range(n_columns)]
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for column, values in zip(columns, zip(*rows)):
+            column.extend(values)
+    return columns
+
+
+def status_categorical(values) -> pd.Categorical:
+    """Статус как категориальный код (int8) с человекочитаемыми категориями"""
+    categorical = pd.Categorical(values, categories=STATUS_NAMES)
+    return categorical.rename_categories(STATUS_VALUES)
+
+
+def _id_column(values) -> np.ndarray:
+    """Целочисленная колонка; при наличии NULL остаётся float с NaN"""
+    array = np.array(values, dtype=np.float64)
+    if np.isnan(array).any():
+        return array
+    return array.astype(np.int64)
+
+
+COLUMN_CONVERTERS = {
+    "id": _id_column,
+    "title": lambda values: np.array(values, dtype=object),
+    "status": status_categorical,
+    "created_at": lambda values: pd.to_datetime(pd.Series(values, dtype=object)).to_numpy(),
+    "owner_id": _id_column,
+}
+
+
+def load_tasks_frame(
+    db: Session,
+    owner_id: Optional[int] = None,
+    status: Optional[str] = None,
+    columns: Sequence[str] = TASK_COLUMNS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    include_archived: bool = True,
+) -> pd.DataFrame:
+    """
+    Загружает задачи в DataFrame по колонкам:
+    - строки берутся из DBAPI курсора (Core-соединение сессии) без ORM-объектов
+      и словарей на строку
+    - числовые колонки - типизированные массивы NumPy
+    - статус - категориальная колонка
+    - вместе с архивом (tasks_archive), include_archived=False - только горячие
+    """
+    query = build_tasks_query(owner_id=owner_id, status=status, columns=columns, include_archived=include_archived)
+    result = db.connection().execute(query)
+    try:
+        raw_columns = fetch_columns(result.cursor, len(columns), chunk_size=chunk_size)
+    finally:
+        result.close()
+
+    return pd.DataFrame(
+        {
+            name: COLUMN_CONVERTERS[name](values)
+            for name, values in zip(columns, raw_columns)
+        },
+        columns=list(columns),
+    )
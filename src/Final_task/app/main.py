@@ -3,30 +3,92 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import timedelta
-from .database import engine, Base, get_db
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+from .database import engine, Base, get_db, SessionLocal
 from .models import User as UserModel
-from .routers import tasks, analytics
+from .routers import tasks, analytics, health, reviews
+from .reviews import close_mongo_client
+from .partitions import ensure_partitions, is_partitioned
+from .archive import run_archiver
+from .responses import default_response_class
+from .compression import CompressionMiddleware
+from .profiling import SQLProfilingMiddleware, sql_profile_registry
+from .metrics import MetricsMiddleware, metrics_response
+from .config import settings
 from .crud import get_user_by_username, create_user
 from .schemas import UserCreate, Token, User as UserSchema
 from .auth import (
     create_access_token,
     verify_password,
     get_password_hash,
+    require_admin,
     User,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
 
+logger = logging.getLogger(__name__)
+
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Task Tracker API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Партиции tasks на ближайшие месяцы (PostgreSQL после миграции b7e2f4a91c3d).
+    # Ошибка обслуживания не мешает старту: остальное сделает cron (app.partitions)
+    try:
+        with engine.begin() as connection:
+            if is_partitioned(connection):
+                ensure_partitions(connection, settings.partitions_months_ahead)
+    except SQLAlchemyError:
+        logger.exception("не удалось создать партиции tasks")
+    archiver = None
+    if settings.archive_after_days is not None:
+        archiver = asyncio.create_task(
+            run_archiver(
+                SessionLocal,
+                settings.archive_after_days,
+                settings.archive_batch_size,
+                settings.archive_interval_seconds,
+            )
+        )
+    yield
+    if archiver is not None:
+        archiver.cancel()
+        with suppress(asyncio.CancelledError):
+            await archiver
+    await close_mongo_client()
+
+
+app = FastAPI(
+    title="Task Tracker API",
+    version="1.0.0",
+    default_response_class=default_response_class(),
+    lifespan=lifespan,
+)
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        compressible_types=settings.compression_types,
+        use_brotli=settings.compression_brotli,
+    )
+if settings.sql_profiling:
+    app.add_middleware(SQLProfilingMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, engine=engine)
 app.include_router(tasks.router)
 app.include_router(analytics.router)
+app.include_router(health.router)
+app.include_router(reviews.router)
 
 app.openapi_tags = [
     {"name": "Tasks", "description": "CRUD операции с задачами"},
     {"name": "Analytics", "description": "Статистика и графики"},
     {"name": "Auth", "description": "Аутентификация"},
     {"name": "Health", "description": "Проверка состояния"},
+    {"name": "Reviews", "description": "Отчёты по отзывам (MongoDB)"},
 ]
 
 
@@ -73,10 +135,28 @@ def login(
 
 @app.get("/health", tags=["Health"])
 def health_check():
-    """Проверка работоспособности API"""
+    """Проверка работоспособности API (liveness; readiness - /health/ready)"""
     return {"status": "healthy", "service": "Task Tracker API"}
 
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Метрики Prometheus: латентность и статусы по маршрутам, пулы, кеши"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return metrics_response(engine)
+
+
+@app.get("/debug/sql-profile", tags=["Health"])
+def sql_profile(current_user: User = Depends(require_admin)):
+    """
+    SQL-профиль по маршрутам (только администратор):
+    - число запросов к БД и время в БД на HTTP-запрос (гистограммы)
+    - включается настройкой SQL_PROFILING=true
+    """
+    return {"enabled": settings.sql_profiling, "routes": sql_profile_registry.snapshot()}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,137 @@
+import os
+import time
+import anyio.to_thread
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .profiling import route_path
+
+# Мультипроцессный режим (uvicorn --workers / gunicorn): значения пишутся
+# в mmap-файлы каталога PROMETHEUS_MULTIPROC_DIR и суммируются при сборе
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_TOTAL = Counter(
+    "http_requests_total",
+    "Количество HTTP-запросов",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Запросы в обработке",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_busy_threads",
+    "Занятые потоки threadpool (sync-эндпоинты и зависимости)",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_SIZE = Gauge(
+    "threadpool_max_threads",
+    "Размер threadpool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Размер пула соединений", multiprocess_mode="livesum")
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Выданные соединения пула", multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Соединения сверх pool_size", multiprocess_mode="livesum"
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Обращения к кешам (hit/miss); hit ratio = hit / (hit + miss)",
+    ["cache", "result"],
+)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def update_pool_metrics(engine):
+    pool = engine.pool
+    # StaticPool / NullPool не имеют size()/checkedout()
+    if hasattr(pool, "checkedout"):
+        DB_POOL_SIZE.set(pool.size())
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def update_threadpool_metrics():
+    """Вызывать из event loop (async-код): лимитер anyio привязан к нему"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    THREADPOOL_SIZE.set(limiter.total_tokens)
+
+
+class MetricsMiddleware:
+    """Латентность, статусы и запросы в обработке по маршрутам (шаблон пути)"""
+
+    def __init__(self, app: ASGIApp, engine=None):
+        self.app = app
+        self.engine = engine
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            route = route_path(scope)
+            REQUEST_LATENCY.labels(scope["method"], route).observe(
+                time.perf_counter() - started
+            )
+            REQUESTS_TOTAL.labels(scope["method"], route, str(status_code)).inc()
+            # Каждый воркер обновляет свои значения, при сборе они суммируются
+            update_threadpool_metrics()
+            if self.engine is not None:
+                update_pool_metrics(self.engine)
+
+
+def metrics_response(engine=None) -> Response:
+    """Текст в формате Prometheus; в мультипроцессном режиме - сумма по воркерам"""
+    update_threadpool_metrics()
+    if engine is not None:
+        update_pool_metrics(engine)
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        data = generate_latest(registry)
+    else:
+        data = generate_latest()
+    return Response(data, media_type=CONTENT_TYPE_LATEST)
+
+
+def child_exit(server, worker):
+    """Хук gunicorn (gunicorn.conf.py): убирает live-gauge завершившегося воркера"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, DateTime, Boolean, Index, DDL, event
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -25,9 +25,30 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(RoleEnum), default=RoleEnum.user)
     is_active = Column(Boolean, default=True)
+    # Счётчик изменений задач пользователя (для ETag списков)
+    tasks_version = Column(Integer, default=0, server_default="0", nullable=False)
     tasks = relationship("Task", back_populates="owner")
 
 
+class TasksVersion(Base):
+    """
+    Общий счётчик изменений задач (ETag списка всех задач у админа): одна строка,
+    только растёт - в отличие от суммы счётчиков пользователей, которая
+    уменьшается при удалении пользователя и требует прохода по users
+    """
+    __tablename__ = "tasks_versions"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, default=0, server_default="0", nullable=False)
+
+
+# Единственная строка счётчика создаётся вместе с таблицей (create_all)
+event.listen(
+    TasksVersion.__table__,
+    "after_create",
+    DDL("INSERT INTO tasks_versions (id, version) VALUES (1, 0)"),
+)
+
+
 class Task(Base):
     __tablename__ = "tasks"
     id = Column(Integer, primary_key=True, index=True)
@@ -37,3 +58,19 @@ class Task(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="tasks")
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    # Поиск выполненных задач для архива (app.archive)
+    __table_args__ = (Index("ix_tasks_status_updated_at", "status", "updated_at"),)
+
+
+class TaskArchive(Base):
+    """Выполненные задачи, перенесённые из tasks архиватором (app.archive)"""
+    __tablename__ = "tasks_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String, nullable=False)
+    description = Column(String)
+    status = Column(Enum(TaskStatus), default=TaskStatus.done)
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
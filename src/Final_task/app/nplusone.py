@@ -0,0 +1,58 @@
+import logging
+from collections import Counter
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SESSION_INFO_KEY = "lazy_loads"
+
+
+class NPlusOneError(RuntimeError):
+    """Ленивая загрузка связи повторилась больше порога в одной сессии"""
+
+
+class LazyLoadDetector:
+    """
+    Считает ленивые загрузки связей (Task.owner, User.tasks) в сессии.
+
+    Сессия живёт один HTTP-запрос (get_db), поэтому счётчик - на запрос.
+    Больше threshold загрузок одной связи - это N+1: NPlusOneError
+    при raise_error, иначе предупреждение в лог (один раз на связь).
+    """
+
+    def __init__(self, threshold: int, raise_error: bool = False):
+        self.threshold = threshold
+        self.raise_error = raise_error
+
+    def __call__(self, orm_execute_state):
+        # selectinload/joinedload тоже relationship load, но без lazy_loaded_from
+        if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+            return
+        relationship = str(orm_execute_state.loader_strategy_path[-1])
+        counts = orm_execute_state.session.info.setdefault(SESSION_INFO_KEY, Counter())
+        counts[relationship] += 1
+        if counts[relationship] != self.threshold + 1:
+            return
+        message = (
+            f"N+1: {relationship} загружена лениво {counts[relationship]} раз за сессию, "
+            f"используйте selectinload/joinedload"
+        )
+        if self.raise_error:
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+def install_lazy_load_detector(session_factory, threshold: int, raise_error: bool = False):
+    """Подписывает sessionmaker на do_orm_execute; возвращает детектор"""
+    detector = LazyLoadDetector(threshold, raise_error)
+    event.listen(session_factory, "do_orm_execute", detector)
+    return detector
+
+
+def lazy_load_counts(session) -> dict:
+    """Ленивые загрузки по связям с начала сессии (или reset_lazy_loads)"""
+    return dict(session.info.get(SESSION_INFO_KEY, {}))
+
+
+def reset_lazy_loads(session):
+    session.info.pop(SESSION_INFO_KEY, None)
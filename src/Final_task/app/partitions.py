@@ -0,0 +1,145 @@
+"""
+Обслуживание месячных партиций tasks (PostgreSQL, миграция b7e2f4a91c3d):
+- ensure_partitions: партиции tasks_pYYYYMM на months_ahead месяцев вперёд
+- apply_retention: партиции старше keep_months отсоединяются (DETACH) и,
+  при drop, удаляются - без DELETE по строкам и раздувания индексов
+
+CLI (из src/Final_task, для cron):
+    python -m app.partitions --months-ahead 3 --keep-months 24 [--drop]
+"""
+import argparse
+import logging
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from .crud import bump_tasks_versions
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "tasks"
+PARTITION_PREFIX = "tasks_p"
+# Ключ advisory-блокировки обслуживания партиций
+PARTITION_LOCK = "tasks_partitions"
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    """Месяц по имени партиции (tasks_p202610 -> 2026-10-01); None для tasks_default"""
+    suffix = name[len(PARTITION_PREFIX):]
+    if not name.startswith(PARTITION_PREFIX) or not suffix.isdigit():
+        return None
+    return datetime(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def is_partitioned(connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": PARENT_TABLE},
+    ).scalar()
+    return relkind == "p"
+
+
+def list_partitions(connection) -> List[str]:
+    return list(
+        connection.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = to_regclass(:table) ORDER BY child.relname"
+            ),
+            {"table": PARENT_TABLE},
+        ).scalars()
+    )
+
+
+def ensure_partitions(connection, months_ahead: int = 3, now: Optional[datetime] = None) -> List[str]:
+    """
+    Создаёт недостающие партиции с текущего месяца до months_ahead вперёд.
+    Вызывается при старте каждого воркера: воркеры выполняют его по очереди
+    (advisory-блокировка до конца транзакции), месяц, который создать нельзя,
+    пропускается с предупреждением
+    """
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:lock))"), {"lock": PARTITION_LOCK})
+    current = month_start(now or datetime.utcnow())
+    existing = set(list_partitions(connection))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(
+                    text(
+                        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+                        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+                    )
+                )
+        except DBAPIError as error:
+            # Строки этого месяца уже лежат в tasks_default (обслуживание долго
+            # не запускалось) - их нужно перенести вручную
+            logger.warning("партиция %s не создана: %s", name, error.orig)
+            continue
+        created.append(name)
+    return created
+
+
+def apply_retention(connection, keep_months: int, drop: bool = False,
+                    now: Optional[datetime] = None) -> List[str]:
+    """
+    Отсоединяет партиции месяцев старше keep_months (текущий месяц не считается).
+    Отсоединённая партиция остаётся отдельной таблицей (архив), при drop удаляется
+    """
+    cutoff = add_months(month_start(now or datetime.utcnow()), -keep_months)
+    removed = []
+    for name in list_partitions(connection):
+        month = partition_month(name)
+        if month is None or month >= cutoff:
+            continue
+        owner_ids = connection.execute(text(f'SELECT DISTINCT owner_id FROM "{name}"')).scalars().all()
+        connection.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+        if drop:
+            connection.execute(text(f'DROP TABLE "{name}"'))
+        # Задачи исчезли из списков владельцев - их ETag должен смениться
+        bump_tasks_versions(connection, owner_ids)
+        removed.append(name)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание партиций tasks")
+    parser.add_argument("--months-ahead", type=int, default=3)
+    parser.add_argument("--keep-months", type=int, default=None, help="хранить месяцев (без - не трогать)")
+    parser.add_argument("--drop", action="store_true", help="удалять, а не только отсоединять")
+    args = parser.parse_args()
+
+    from .database import engine
+
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            print("tasks не партиционирована (нужен PostgreSQL и миграция b7e2f4a91c3d)")
+            return
+        print("создано:", ensure_partitions(connection, args.months_ahead))
+        if args.keep_months is not None:
+            action = "удалено" if args.drop else "отсоединено"
+            print(f"{action}:", apply_retention(connection, args.keep_months, drop=args.drop))
+
+
+if __name__ == "__main__":
+    main()
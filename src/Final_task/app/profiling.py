@@ -0,0 +1,193 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50)
+DB_TIME_MS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class RequestStats:
+    """SQL-статистика одного запроса: число запросов (из них упавших), время в БД, строки"""
+
+    __slots__ = ("queries", "errors", "db_time", "rows")
+
+    def __init__(self):
+        self.queries = 0
+        self.errors = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+
+# Объект создаётся в middleware; контекст копируется в threadpool
+# вместе со ссылкой, поэтому sync-эндпоинты пишут в тот же объект
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+# Время старта хранится в контексте выполнения самого запроса, а не на соединении:
+# контекст упавшего запроса выбрасывается вместе с ним, и на соединении из пула
+# не остаётся «висящих» отметок, сбивающих замеры следующих запросов
+_STARTED_ATTR = "_profiling_started"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        setattr(context, _STARTED_ATTR, time.perf_counter())
+
+
+def _record_query(context, cursor=None, failed=False):
+    started = getattr(context, _STARTED_ATTR, None)
+    stats = current_request_stats.get()
+    if started is None or stats is None:
+        return
+    delattr(context, _STARTED_ATTR)
+    stats.queries += 1
+    stats.errors += failed
+    stats.db_time += time.perf_counter() - started
+    # psycopg2 сообщает число строк SELECT; sqlite3 возвращает -1
+    if cursor is not None and cursor.rowcount and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(context, cursor)
+
+
+def _handle_error(exception_context):
+    # Упавший запрос тоже занимал БД: учитываем его время, строк у него нет
+    if exception_context.execution_context is not None:
+        _record_query(exception_context.execution_context, failed=True)
+
+
+def install_sql_profiling(engine):
+    """Подписывает engine на события выполнения запросов (повторный вызов ничего не делает)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "total")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def as_dict(self) -> dict:
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {"buckets": dict(zip(labels, self.counts)), "sum": round(self.total, 3)}
+
+
+class RouteProfile:
+    __slots__ = ("requests", "rows", "errors", "queries", "db_time_ms", "max_queries")
+
+    def __init__(self):
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.max_queries = 0
+        self.queries = _Histogram(QUERY_COUNT_BUCKETS)
+        self.db_time_ms = _Histogram(DB_TIME_MS_BUCKETS)
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "avg_queries": round(self.queries.total / self.requests, 2),
+            "max_queries": self.max_queries,
+            "avg_db_time_ms": round(self.db_time_ms.total / self.requests, 3),
+            "rows": self.rows,
+            "errors": self.errors,
+            "queries": self.queries.as_dict(),
+            "db_time_ms": self.db_time_ms.as_dict(),
+        }
+
+
+class SQLProfileRegistry:
+    """Агрегированные по маршрутам гистограммы (в памяти процесса)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route: str, stats: RequestStats):
+        with self._lock:
+            profile = self._routes.get(route)
+            if profile is None:
+                profile = self._routes[route] = RouteProfile()
+            profile.requests += 1
+            profile.rows += stats.rows
+            profile.errors += stats.errors
+            profile.max_queries = max(profile.max_queries, stats.queries)
+            profile.queries.observe(stats.queries)
+            profile.db_time_ms.observe(stats.db_time * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {route: profile.as_dict() for route, profile in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+sql_profile_registry = SQLProfileRegistry()
+
+
+def route_path(scope: Scope) -> str:
+    """Шаблон пути (/tasks/{task_id}), а не конкретный URL"""
+    return getattr(scope.get("route"), "path", None) or "<unmatched>"
+
+
+def route_name(scope: Scope) -> str:
+    return f"{scope['method']} {route_path(scope)}"
+
+
+class SQLProfilingMiddleware:
+    """
+    Считает SQL-запросы каждого HTTP-запроса:
+    - заголовок Server-Timing: db (время в БД, число запросов и строк) и app
+    - агрегирует статистику по маршрутам в sql_profile_registry
+    """
+
+    def __init__(self, app: ASGIApp, registry: SQLProfileRegistry = sql_profile_registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                headers = MutableHeaders(raw=message["headers"])
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries, {stats.rows} rows", '
+                    f"app;dur={total_ms:.2f}",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+            self.registry.record(route_name(scope), stats)
@@ -0,0 +1,57 @@
+from typing import List, Optional
+import pandas as pd
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy.engine import Row
+from .schemas import Task
+from .config import settings
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Поля и их порядок - как у схемы Task (response_model)
+TASK_FIELDS = tuple(Task.model_fields)
+
+# Схема строится один раз; валидация и сериализация - в pydantic-core
+TASK_ADAPTER = TypeAdapter(Task)
+TASKS_ADAPTER = TypeAdapter(List[Task])
+
+
+def default_response_class():
+    """Класс ответа по умолчанию для всего приложения (orjson или stdlib json)"""
+    return ORJSONResponse if settings.orjson_responses else JSONResponse
+
+
+def task_fields(task) -> dict:
+    """
+    Поля схемы Task из ORM-объекта или строки запроса (Row).
+    Загруженные колонки ORM-объекта лежат в его __dict__: чтение оттуда обходит
+    дескрипторы SQLAlchemy, которые и были основной ценой from_attributes-валидации;
+    выгруженные (expired) атрибуты читаются обычным getattr
+    """
+    state = task._mapping if isinstance(task, Row) else vars(task)
+    return {name: state[name] if name in state else getattr(task, name) for name in TASK_FIELDS}
+
+
+def tasks_json_response(tasks, headers: Optional[dict] = None) -> Response:
+    """
+    Быстрый путь для списков задач: поля строк проверяются схемой Task один раз
+    (из словарей, без from_attributes) и сразу сериализуются в JSON, без
+    jsonable_encoder. JSON тот же, что у response_model: те же поля в том же
+    порядке, Enum - значением, datetime - ISO 8601
+    """
+    validated = TASKS_ADAPTER.validate_python([task_fields(task) for task in tasks])
+    return Response(TASKS_ADAPTER.dump_json(validated), media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+def task_json_response(task, headers: Optional[dict] = None) -> Response:
+    """То же для одной задачи"""
+    validated = TASK_ADAPTER.validate_python(task_fields(task))
+    return Response(TASK_ADAPTER.dump_json(validated), media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+def frame_json_response(df: pd.DataFrame) -> Response:
+    """Таблица {"data": [...], "total": N} из DataFrame через сериализатор pandas"""
+    records = df.to_json(orient="records", date_format="iso", date_unit="us")
+    content = f'{{"data":{records},"total":{len(df)}}}'.encode()
+    return Response(content, media_type=JSON_MEDIA_TYPE)
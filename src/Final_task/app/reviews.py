@@ -0,0 +1,99 @@
+import asyncio
+from typing import List, Optional
+from pymongo import AsyncMongoClient
+from .config import settings
+
+# Режимы отчёта по нескольким товарам
+REPORT_MODES = ("rollups", "pipeline", "concurrent")
+
+_client: Optional[AsyncMongoClient] = None
+
+
+def get_mongo_client() -> AsyncMongoClient:
+    """Один клиент на процесс: пул соединений делят все запросы"""
+    global _client
+    if _client is None:
+        _client = AsyncMongoClient(
+            settings.mongo_url,
+            maxPoolSize=settings.mongo_max_pool_size,
+            minPoolSize=settings.mongo_min_pool_size,
+            serverSelectionTimeoutMS=settings.mongo_timeout_ms,
+        )
+    return _client
+
+
+async def close_mongo_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def products_report_pipeline(product_ids: List[str]) -> list:
+    """
+    Отчёт по нескольким товарам одним $match {$in} + $group; $project только
+    полей индекса (order_data.product_id, rating) - покрытый запрос
+    """
+    return [
+        {"$match": {"order_data.product_id": {"$in": product_ids}}},
+        {"$project": {"_id": 0, "order_data.product_id": 1, "rating": 1}},
+        {"$group": {
+            "_id": "$order_data.product_id",
+            "total_reviews": {"$sum": 1},
+            "average_rating": {"$avg": "$rating"},
+            "min_rating": {"$min": "$rating"},
+            "max_rating": {"$max": "$rating"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def _rollup_report(rollup: dict) -> dict:
+    return {
+        "_id": rollup["_id"],
+        "total_reviews": rollup["count"],
+        "average_rating": rollup["sum"] / rollup["count"],
+        "min_rating": rollup["min"],
+        "max_rating": rollup["max"],
+    }
+
+
+class AsyncMongoReviews:
+    """
+    Асинхронные отчёты по отзывам (коллекции mongodb_review.MongoReviews):
+    - rollups: готовые агрегаты из <reviews>_by_product, один find {$in}
+    - pipeline: один aggregate $match {$in} + $group по reviews
+    - concurrent: aggregate на каждый товар, параллельно через asyncio.gather
+    """
+
+    def __init__(self, client: AsyncMongoClient, db_name: str = "customer",
+                 collection_name: str = "reviews"):
+        db = client[db_name]
+        self.collection = db[collection_name]
+        self.product_rollups = db[f"{collection_name}_by_product"]
+
+    async def get_product_report(self, product_id: str) -> List[dict]:
+        cursor = await self.collection.aggregate(products_report_pipeline([product_id]))
+        return await cursor.to_list()
+
+    async def get_products_report(self, product_ids: List[str], mode: str = "rollups") -> List[dict]:
+        if mode == "rollups":
+            cursor = self.product_rollups.find({"_id": {"$in": product_ids}}).sort("_id", 1)
+            return [_rollup_report(rollup) async for rollup in cursor]
+        if mode == "pipeline":
+            cursor = await self.collection.aggregate(
+                products_report_pipeline(product_ids), allowDiskUse=True
+            )
+            return await cursor.to_list()
+        if mode == "concurrent":
+            reports = await asyncio.gather(
+                *(self.get_product_report(product_id) for product_id in product_ids)
+            )
+            return [report for product_reports in reports for report in product_reports]
+        raise ValueError(f"Неизвестный режим отчёта: {mode}")
+
+
+def get_reviews() -> AsyncMongoReviews:
+    return AsyncMongoReviews(
+        get_mongo_client(), settings.mongo_db, settings.mongo_reviews_collection
+    )
@@ -1,37 +1,49 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import io
-from ..database import get_db
-from ..models import Task, User as UserModel
+from ..database import get_db, get_session_factory
+from ..models import TaskStatus
+from ..crud import count_tasks_by_status, count_tasks_by_user
+from ..loaders import load_tasks_frame
+from ..export import EXPORT_FORMATS, stream_task_export
 from ..auth import require_user, require_admin, User
+from ..responses import frame_json_response
+from ..config import settings
 from typing import Optional
+from datetime import datetime
 import numpy as np
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+# PNG уже сжат и middleware его не трогает; при png_optimize
+# Pillow перекодирует его с подбором фильтров и максимальным сжатием
+PNG_SAVE_OPTIONS = {"pil_kwargs": {"optimize": True}} if settings.png_optimize else {}
+
 
 @router.get("/tasks-by-status")
 async def tasks_by_status(
-    current_user: User = Depends(require_user), db: Session = Depends(get_db)
+    include_archived: bool = True,
+    current_user: User = Depends(require_user),
+    db: Session = Depends(get_db),
 ):
     """
     Возвращает график статистики задач по статусам:
     - Обычный пользователь видит только свои задачи
     - Админ видит все задачи
+    - Выполненные задачи из архива (tasks_archive) учитываются;
+      include_archived=false - только горячая таблица
     """
 
-    # Фильтрация данных по роли пользователя
-    if current_user.role == "admin":
-        tasks = db.query(Task).all()
-    else:
-        tasks = db.query(Task).filter(Task.owner_id == current_user.id).all()
+    # Фильтрация данных по роли пользователя, подсчёт на стороне БД
+    owner_id = None if current_user.role == "admin" else current_user.id
+    counts = count_tasks_by_status(db, owner_id=owner_id, include_archived=include_archived)
 
     # Проверка наличия данных
-    if not tasks:
+    if not counts:
         return {"error": "Нет данных для анализа"}
 
     STATUS_LABELS = {
@@ -42,9 +54,9 @@ async def tasks_by_status(
         "done": "Выполнено",
     }
 
-    # Создание DataFrame для анализа
-    df = pd.DataFrame([{"status": task.status.value, "count": 1} for task in tasks])
-    status_counts = df.groupby("status").size()
+    # Series по статусам (в том же порядке, что и groupby)
+    status_counts = pd.Series(counts).sort_index()
+    total_tasks = int(status_counts.sum())
 
     STATUS_COLORS = {
         "new": "#FF6B6B",  # Красный для новых задач
@@ -62,7 +74,7 @@ async def tasks_by_status(
     bars = plt.bar(status_counts.index, status_counts.values, color=colors)
 
     # Настройка заголовка и осей
-    plt.title(f"Задачи по статусам (всего задач - {len(tasks)})", fontsize=16, pad=20)
+    plt.title(f"Задачи по статусам (всего задач - {total_tasks})", fontsize=16, pad=20)
     plt.xlabel("Статус задачи", fontsize=12)
     plt.ylabel("Количество задач", fontsize=12)
     plt.gca().yaxis.set_major_locator(plt.MultipleLocator(1))
@@ -92,7 +104,7 @@ async def tasks_by_status(
 
     # Сохранение графика в память
     img_buffer = io.BytesIO()
-    plt.savefig(img_buffer, format="png", dpi=300, bbox_inches="tight")
+    plt.savefig(img_buffer, format="png", dpi=300, bbox_inches="tight", **PNG_SAVE_OPTIONS)
     img_buffer.seek(0)
     plt.close("all")  # Закрытие всех фигур для освобождения памяти
 
@@ -117,24 +129,16 @@ async def tasks_by_user(
     if current_user.role != "admin":
         return {"error": "Доступ только для администратора"}
 
-    # Получаем ТОЛЬКО задачи "in progress"
-    tasks_in_progress = db.query(Task).filter(Task.status == "in_progress").all()
-    if not tasks_in_progress:
-        return {"error": "Нет задач в работе для анализа"}
-
-    # Получаем ВСЕХ пользователей
-    all_users = db.query(UserModel.id, UserModel.username).all()
-    if not all_users:
+    # Подсчет задач "in progress" для ВСЕХ пользователей одним запросом
+    user_rows = count_tasks_by_user(db, TaskStatus.in_progress)
+    if not user_rows:
         return {"error": "Нет пользователей"}
 
-    # Подсчет задач в работе для каждого пользователя
-    df_data = []
-    for user in all_users:
-        user_task_count = len([t for t in tasks_in_progress if t.owner_id == user.id])
-        df_data.append({"username": user.username, "count": user_task_count})
-
-    df = pd.DataFrame(df_data)
-    user_counts = df.set_index("username")["count"]
+    usernames, counts = zip(*user_rows)
+    user_counts = pd.Series(np.array(counts, dtype=np.int64), index=list(usernames))
+    total_in_progress = int(user_counts.sum())
+    if not total_in_progress:
+        return {"error": "Нет задач в работе для анализа"}
 
     # Создание графика
     plt.figure(figsize=(12, 8))
@@ -146,7 +150,7 @@ async def tasks_by_user(
 
     # Настройка заголовка и осей
     plt.title(
-        f"Задачи В РАБОТЕ по пользователям (всего задач - {len(tasks_in_progress)})", fontsize=16, pad=20
+        f"Задачи В РАБОТЕ по пользователям (всего задач - {total_in_progress})", fontsize=16, pad=20
     )
     plt.xlabel("Пользователь", fontsize=12)
     plt.ylabel("Задачи в работе", fontsize=12)
@@ -173,7 +177,7 @@ async def tasks_by_user(
 
     # Сохранение графика в память
     img_buffer = io.BytesIO()
-    plt.savefig(img_buffer, format="png", dpi=300, bbox_inches="tight")
+    plt.savefig(img_buffer, format="png", dpi=300, bbox_inches="tight", **PNG_SAVE_OPTIONS)
     img_buffer.seek(0)
     plt.close("all")
 
@@ -187,31 +191,47 @@ async def tasks_by_user(
 @router.get("/tasks-table")
 async def tasks_table_json(
     status: Optional[str] = None,
+    include_archived: bool = True,
     current_user: User = Depends(require_user),
     db: Session = Depends(get_db),
 ):
-    """JSON таблица для фронтенда"""
-
-    if current_user.role == "admin":
-        query = db.query(Task)
-    else:
-        query = db.query(Task).filter(Task.owner_id == current_user.id)
-
-    if status:
-        query = query.filter(Task.status == status)
-
-    tasks = query.all()
-    df = pd.DataFrame(
-        [
-            {
-                "id": t.id,
-                "title": t.title,
-                "status": t.status.value,
-                "created_at": t.created_at,
-                "owner_id": t.owner_id,
-            }
-            for t in tasks
-        ]
-    )
+    """JSON таблица для фронтенда (вместе с архивом, include_archived=false - без него)"""
+
+    owner_id = None if current_user.role == "admin" else current_user.id
+    df = load_tasks_frame(db, owner_id=owner_id, status=status, include_archived=include_archived)
 
-    return {"data": df.to_dict("records"), "total": len(df)}
+    return frame_json_response(df)
+
+
+@router.get("/tasks-export")
+def tasks_export(
+    format: str = Query("parquet", pattern="^(parquet|arrow)$"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    with_usernames: bool = False,
+    include_archived: bool = True,
+    current_user: User = Depends(require_user),
+    session_factory: sessionmaker = Depends(get_session_factory),
+):
+    """
+    Выгрузка задач для офлайн-анализа в Parquet или Arrow IPC stream:
+    - Обычный пользователь выгружает только свои задачи
+    - Админ выгружает все задачи (опционально с именами владельцев)
+    - Фильтр по created_at: [date_from, date_to)
+    - Вместе с архивом (tasks_archive), include_archived=false - без него
+    """
+    owner_id = None if current_user.role == "admin" else current_user.id
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_task_export(
+            session_factory,
+            format,
+            with_usernames=with_usernames,
+            owner_id=owner_id,
+            date_from=date_from,
+            date_to=date_to,
+            include_archived=include_archived,
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=tasks.{extension}"},
+    )
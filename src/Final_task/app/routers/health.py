@@ -0,0 +1,155 @@
+import time
+from typing import Optional
+import anyio
+import anyio.to_thread
+import redis
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from ..database import engine, pool_options
+from ..config import settings
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+def pool_stats() -> dict:
+    """
+    Загрузка пула соединений; saturation = 1.0 - свободных соединений нет.
+    Ёмкость - pool_size + max_overflow из настроек; при неограниченном
+    overflow (-1) пул не исчерпывается и saturation всегда 0
+    """
+    pool = engine.pool
+    if not hasattr(pool, "checkedout") or "pool_size" not in pool_options:
+        return {"saturation": 0.0}
+    checked_out = pool.checkedout()
+    stats = {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+    }
+    if settings.db_max_overflow < 0:
+        return {**stats, "capacity": None, "saturation": 0.0}
+    capacity = settings.db_pool_size + settings.db_max_overflow
+    return {
+        **stats,
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+def _probe_database():
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            # Брошенная по таймауту проверка не должна держать соединение пула:
+            # сервер сам прервёт запрос (действует только в этой транзакции)
+            connection.execute(
+                text("SELECT set_config('statement_timeout', :timeout, true)"),
+                {"timeout": f"{int(settings.readiness_timeout * 1000)}ms"},
+            )
+        connection.execute(text("SELECT 1"))
+
+
+def _probe_redis():
+    client = redis.Redis.from_url(
+        settings.redis_url,
+        socket_timeout=settings.readiness_timeout,
+        socket_connect_timeout=settings.readiness_timeout,
+    )
+    try:
+        client.ping()
+    finally:
+        client.close()
+
+
+async def _run_check(probe) -> dict:
+    """Проверка в отдельном потоке с бюджетом времени readiness_timeout"""
+    started = time.perf_counter()
+    try:
+        with anyio.fail_after(settings.readiness_timeout):
+            await anyio.to_thread.run_sync(probe, abandon_on_cancel=True)
+        status = "ok"
+        error = None
+    except TimeoutError:
+        status, error = "fail", "timeout"
+    except Exception as exc:
+        status, error = "fail", type(exc).__name__
+    result = {"status": status, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+    if error:
+        result["error"] = error
+    return result
+
+
+class ReadinessCache:
+    """
+    Результат проверки живёт readiness_cache_seconds: не чаще одной проверки
+    за интервал, параллельные запросы во время проверки получают прошлый результат
+    """
+
+    def __init__(self):
+        self.result: Optional[dict] = None
+        self.checked_at = 0.0
+        self.probing = False
+
+    def fresh(self) -> Optional[dict]:
+        if self.result and time.monotonic() - self.checked_at < settings.readiness_cache_seconds:
+            return self.result
+        return None
+
+    def store(self, result: dict):
+        self.result = result
+        self.checked_at = time.monotonic()
+
+
+readiness_cache = ReadinessCache()
+
+
+async def _probe_dependencies() -> dict:
+    pool = pool_stats()
+    # Пул исчерпан: SELECT 1 только встанет в очередь за соединением
+    if pool["saturation"] >= 1.0:
+        return {
+            "status": "unavailable",
+            "checks": {"database": {"status": "fail", "error": "pool exhausted"}},
+            "pool": pool,
+        }
+
+    checks = {"database": await _run_check(_probe_database)}
+    if settings.redis_url:
+        checks["redis"] = await _run_check(_probe_redis)
+    ready = all(check["status"] == "ok" for check in checks.values())
+    return {"status": "ready" if ready else "unavailable", "checks": checks, "pool": pool}
+
+
+async def check_readiness() -> dict:
+    cached = readiness_cache.fresh()
+    if cached:
+        return cached
+    if readiness_cache.probing and readiness_cache.result:
+        return readiness_cache.result
+
+    readiness_cache.probing = True
+    try:
+        result = await _probe_dependencies()
+    finally:
+        readiness_cache.probing = False
+    readiness_cache.store(result)
+    return result
+
+
+@router.get("/live")
+def liveness():
+    """Liveness: процесс отвечает (зависимости не проверяются)"""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness():
+    """
+    Readiness для балансировщика:
+    - SELECT 1 в БД и PING в Redis (если задан REDIS_URL) с таймаутом
+    - результат кешируется на readiness_cache_seconds
+    - при исчерпанном пуле соединений сразу 503
+    """
+    result = await check_readiness()
+    status_code = 200 if result["status"] == "ready" else 503
+    return JSONResponse(result, status_code=status_code)
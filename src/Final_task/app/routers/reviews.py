@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pymongo.errors import PyMongoError
+from typing import List
+from ..reviews import REPORT_MODES, AsyncMongoReviews, get_reviews
+from ..auth import require_user, User
+from ..config import settings
+
+router = APIRouter(prefix="/reviews", tags=["Reviews"])
+
+
+def reviews_client() -> AsyncMongoReviews:
+    if not settings.mongo_url:
+        raise HTTPException(status_code=503, detail="MongoDB is not configured")
+    return get_reviews()
+
+
+@router.get("/products")
+async def products_report(
+    product_id: List[str] = Query(..., max_length=100),
+    mode: str = Query("rollups", pattern=f"^({'|'.join(REPORT_MODES)})$"),
+    current_user: User = Depends(require_user),
+    reviews: AsyncMongoReviews = Depends(reviews_client),
+):
+    """
+    Отчёт по отзывам для нескольких товаров (?product_id=1&product_id=2):
+    - rollups: готовые агрегаты одним запросом (по умолчанию)
+    - pipeline: один aggregate $match {$in} + $group по отзывам
+    - concurrent: отдельный aggregate на товар, параллельно
+    """
+    try:
+        return await reviews.get_products_report(product_id, mode=mode)
+    except PyMongoError:
+        raise HTTPException(status_code=503, detail="MongoDB unavailable")
+
+
+@router.get("/products/{product_id}")
+async def product_report(
+    product_id: str,
+    current_user: User = Depends(require_user),
+    reviews: AsyncMongoReviews = Depends(reviews_client),
+):
+    """Точный отчёт по одному товару (aggregate по отзывам)"""
+    try:
+        return await reviews.get_product_report(product_id)
+    except PyMongoError:
+        raise HTTPException(status_code=503, detail="MongoDB unavailable")
@@ -1,21 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
+from datetime import datetime
 from ..database import get_db
-from ..crud import get_tasks, create_task, get_task, update_task, delete_task
+from ..crud import (
+    get_tasks,
+    create_task,
+    get_task,
+    update_task,
+    delete_task,
+    get_tasks_version,
+    get_task_meta,
+    get_archived_task,
+)
 from ..schemas import Task, TaskCreate, TaskUpdate
 from ..auth import require_user, require_admin, User
+from ..responses import tasks_json_response, task_json_response
+from ..conditional import make_etag, is_not_modified, not_modified_response, validator_headers
+from ..metrics import record_cache
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
 
-@router.get("/", response_model=List[Task])
+# Ответ собирает tasks_json_response (схема Task), а не response_model:
+# модель указана только для документации OpenAPI
+@router.get("/", response_model=None, responses={200: {"model": List[Task]}, 304: {"description": "Not Modified"}})
 def read_tasks(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
     owner_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    include_archived: bool = False,
     current_user: User = Depends(require_user),
     db: Session = Depends(get_db),
 ):
@@ -23,14 +42,33 @@ def read_tasks(
     Получить список задач с фильтрацией:
     - Обычный пользователь видит только свои задачи
     - Админ видит все задачи (с фильтром по owner_id при необходимости)
+    - date_from/date_to - по created_at [date_from, date_to), читаются только нужные партиции
+    - include_archived - вместе с выполненными задачами из архива (tasks_archive)
+    - ETag по версии списка: If-None-Match -> 304 без загрузки задач
     """
     try:
         # Логика фильтрации по ролям
         filter_owner_id = owner_id if current_user.role == "admin" else current_user.id
+        version = get_tasks_version(db, owner_id=filter_owner_id)
+        etag = make_etag(
+            "tasks", filter_owner_id, version, skip, limit, status, date_from, date_to, include_archived
+        )
+        not_modified = is_not_modified(request, etag)
+        record_cache("etag_tasks", not_modified)
+        if not_modified:
+            return not_modified_response(etag)
+
         tasks = get_tasks(
-            db, skip=skip, limit=limit, status=status, owner_id=filter_owner_id
+            db,
+            skip=skip,
+            limit=limit,
+            status=status,
+            owner_id=filter_owner_id,
+            date_from=date_from,
+            date_to=date_to,
+            include_archived=include_archived,
         )
-        return tasks
+        return tasks_json_response(tasks, headers=validator_headers(etag))
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Database error")
 
@@ -48,9 +86,10 @@ def create_new_task(
         raise HTTPException(status_code=500, detail="Database error")
 
 
-@router.get("/{task_id}", response_model=Task)
+@router.get("/{task_id}", response_model=None, responses={200: {"model": Task}, 304: {"description": "Not Modified"}})
 def read_task(
     task_id: int,
+    request: Request,
     current_user: User = Depends(require_user),
     db: Session = Depends(get_db),
 ):
@@ -58,14 +97,24 @@ def read_task(
     Получить задачу по ID:
     - Обычный пользователь видит только свои задачи
     - Админ видит все задачи
+    - ETag/Last-Modified по updated_at: If-None-Match -> 304 без загрузки строки
+    - Задача, перенесённая в архив, читается из tasks_archive
     """
     try:
-        task = get_task(db, task_id=task_id)
-        if not task or (
-            task.owner_id != current_user.id and current_user.role != "admin"
+        meta = get_task_meta(db, task_id=task_id)
+        if not meta or (
+            meta.owner_id != current_user.id and current_user.role != "admin"
         ):
             raise HTTPException(status_code=404, detail="Task not found")
-        return task
+
+        etag = make_etag("task", task_id, meta.modified_at)
+        not_modified = is_not_modified(request, etag, meta.modified_at)
+        record_cache("etag_task", not_modified)
+        if not_modified:
+            return not_modified_response(etag, meta.modified_at)
+
+        task = get_task(db, task_id=task_id) or get_archived_task(db, task_id=task_id)
+        return task_json_response(task, headers=validator_headers(etag, meta.modified_at))
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Database error")
 
@@ -45,6 +45,7 @@ class Task(TaskBase):
     id: int
     owner_id: int
     created_at: Optional[datetime]
+    updated_at: Optional[datetime] = None
     class Config:
         from_attributes = True
 
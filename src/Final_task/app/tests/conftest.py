@@ -3,11 +3,11 @@ import pytest_asyncio
 import os
 import sys
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
-from jose import jwt
+from datetime import timedelta
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
@@ -15,34 +15,85 @@ sys.path.insert(0, str(PROJECT_ROOT / "app"))
 
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=PROJECT_ROOT / ".env")
+# Тестовый профиль: дешёвый bcrypt (до импорта app.config)
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
 
 from app.main import app
-from app.database import get_db, Base
+from app.database import get_db, get_session_factory, Base
 from app.models import User, Task
 from app.crud import create_task
 from app.schemas import TaskCreate
-from app.auth import get_password_hash
-from app.config import settings
-
-TEST_DATABASE_URL = "sqlite:///./test.db"
-test_engine = create_engine(
-    TEST_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool
-)
+from app.auth import get_password_hash, create_access_token
+from app.profiling import install_sql_profiling
+from app.nplusone import install_lazy_load_detector
+
+# Каждый воркер pytest-xdist (gw0, gw1, ...) - отдельный процесс со своей БД:
+# - SQLite в памяти (по умолчанию): своя у каждого процесса
+# - Postgres (TEST_DATABASE_URL=postgresql://...): своя схема test_<воркер>
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "main")
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+TEST_SCHEMA = f"test_{WORKER_ID}"
+IS_SQLITE = TEST_DATABASE_URL.startswith("sqlite")
+
+
+def make_test_engine():
+    if IS_SQLITE:
+        engine = create_engine(
+            TEST_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+
+        # pysqlite сам начинает и завершает транзакции и ломает SAVEPOINT:
+        # отключаем это и отправляем BEGIN сами
+        @event.listens_for(engine, "connect")
+        def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def _emit_begin(connection):
+            connection.exec_driver_sql("BEGIN")
+
+        return engine
+    # Таблицы и enum-типы создаются в схеме воркера (первой в search_path)
+    return create_engine(
+        TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={TEST_SCHEMA}"}
+    )
+
+
+def _recreate_schema(create: bool):
+    with test_engine.begin() as connection:
+        connection.execute(text(f'DROP SCHEMA IF EXISTS "{TEST_SCHEMA}" CASCADE'))
+        if create:
+            connection.execute(text(f'CREATE SCHEMA "{TEST_SCHEMA}"'))
+
+
+test_engine = make_test_engine()
+install_sql_profiling(test_engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+# Повторная ленивая загрузка одной связи в тесте - ошибка (N+1)
+install_lazy_load_detector(TestingSessionLocal, threshold=1, raise_error=True)
 
 @pytest.fixture(scope="session", autouse=True)
 def create_test_database():
-    Base.metadata.create_all(bind=test_engine)
-    yield
-    Base.metadata.drop_all(bind=test_engine)
+    if IS_SQLITE:
+        Base.metadata.create_all(bind=test_engine)
+        yield
+        Base.metadata.drop_all(bind=test_engine)
+    else:
+        _recreate_schema(create=True)
+        Base.metadata.create_all(bind=test_engine)
+        yield
+        test_engine.dispose()
+        _recreate_schema(create=False)
 
 @pytest_asyncio.fixture
 async def db_session():
     connection = test_engine.connect()
     transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    # commit()/rollback() в тесте работают с SAVEPOINT, внешняя транзакция
+    # откатывается после теста - БД воркера остаётся пустой
+    session = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
     yield session
     session.close()
     transaction.rollback()
@@ -56,47 +107,54 @@ async def test_client(db_session):
         finally:
             pass
     app.dependency_overrides[get_db] = override_get_db
+    # Потоковые ответы открывают свою сессию - на том же соединении теста
+    app.dependency_overrides[get_session_factory] = lambda: lambda: TestingSessionLocal(
+        bind=db_session.bind, join_transaction_mode="create_savepoint"
+    )
     with TestClient(app) as client:
         yield client
     app.dependency_overrides.clear()
 
-@pytest_asyncio.fixture
-async def regular_user(db_session):
-    hashed_password = get_password_hash("userpass")
-    user = User(username="user_test", hashed_password=hashed_password, role="user", is_active=True)
+TEST_PASSWORDS = {"user_test": "userpass", "admin_test": "adminpass"}
+
+@pytest.fixture(scope="session")
+def password_hashes():
+    """Хеш каждого тестового пароля вычисляется один раз за сессию"""
+    return {username: get_password_hash(password) for username, password in TEST_PASSWORDS.items()}
+
+@pytest.fixture(scope="session")
+def auth_headers():
+    """Заранее выпущенные токены; get_current_user ищет пользователя по sub"""
+    return {
+        username: {
+            "Authorization": "Bearer "
+            + create_access_token({"sub": username}, expires_delta=timedelta(hours=1))
+        }
+        for username in TEST_PASSWORDS
+    }
+
+def _add_user(db_session, username, hashed_password, role):
+    user = User(username=username, hashed_password=hashed_password, role=role, is_active=True)
     db_session.add(user)
     db_session.commit()
     db_session.refresh(user)
     return user
 
 @pytest_asyncio.fixture
-async def admin_user(db_session):
-    hashed_password = get_password_hash("adminpass")
-    user = User(username="admin_test", hashed_password=hashed_password, role="admin", is_active=True)
-    db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
-    return user
+async def regular_user(db_session, password_hashes):
+    return _add_user(db_session, "user_test", password_hashes["user_test"], "user")
 
 @pytest_asyncio.fixture
-async def user_token(regular_user):
-    payload = {
-        "sub": regular_user.username,
-        "id": regular_user.id,
-        "role": str(regular_user.role)
-    }
-    token = jwt.encode(payload, settings.secret_key, algorithm="HS256")
-    return {"Authorization": f"Bearer {token}"}
+async def admin_user(db_session, password_hashes):
+    return _add_user(db_session, "admin_test", password_hashes["admin_test"], "admin")
 
 @pytest_asyncio.fixture
-async def admin_token(admin_user):
-    payload = {
-        "sub": admin_user.username,
-        "id": admin_user.id,
-        "role": str(admin_user.role)
-    }
-    token = jwt.encode(payload, settings.secret_key, algorithm="HS256")
-    return {"Authorization": f"Bearer {token}"}
+async def user_token(regular_user, auth_headers):
+    return auth_headers[regular_user.username]
+
+@pytest_asyncio.fixture
+async def admin_token(admin_user, auth_headers):
+    return auth_headers[admin_user.username]
 
 @pytest_asyncio.fixture
 async def create_test_tasks(db_session, regular_user):
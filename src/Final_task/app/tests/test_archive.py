@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+import pytest
+from app.archive import archive_done_tasks
+from app.crud import count_tasks_by_status, get_task, get_tasks, get_tasks_version
+from app.export import iter_task_batches
+from app.loaders import load_tasks_frame
+from app.models import Task, TaskArchive, TaskStatus
+
+@pytest.fixture
+def aged_tasks(db_session, regular_user):
+    old = datetime.utcnow() - timedelta(days=90)
+    tasks = [
+        Task(title="old done 1", status=TaskStatus.done, owner_id=regular_user.id, created_at=old, updated_at=old),
+        Task(title="old done 2", status=TaskStatus.done, owner_id=regular_user.id, created_at=old, updated_at=old),
+        Task(title="old new", status=TaskStatus.new, owner_id=regular_user.id, created_at=old, updated_at=old),
+        Task(title="fresh done", status=TaskStatus.done, owner_id=regular_user.id),
+    ]
+    db_session.add_all(tasks)
+    db_session.commit()
+    return [task.id for task in tasks]
+
+@pytest.mark.asyncio
+async def test_archive_moves_old_done_tasks(db_session, regular_user, aged_tasks):
+    version = get_tasks_version(db_session, regular_user.id)
+    assert archive_done_tasks(db_session, older_than_days=30, batch_size=1) == 2
+    assert [task.title for task in get_tasks(db_session)] == ["old new", "fresh done"]
+    assert db_session.query(TaskArchive).count() == 2
+    assert get_task(db_session, aged_tasks[0]) is None
+    # по версии на каждую пачку
+    assert get_tasks_version(db_session, regular_user.id) == version + 2
+    assert archive_done_tasks(db_session, older_than_days=30) == 0
+
+@pytest.mark.asyncio
+async def test_archived_task_read_through(db_session, test_client, user_token, aged_tasks):
+    archive_done_tasks(db_session, older_than_days=30)
+    response = test_client.get(f"/tasks/{aged_tasks[0]}", headers=user_token)
+    assert response.status_code == 200
+    assert response.json()["title"] == "old done 1"
+    assert response.json()["status"] == "done"
+
+    hot = test_client.get("/tasks/", headers=user_token).json()
+    everything = test_client.get("/tasks/?include_archived=true", headers=user_token).json()
+    assert len(hot) == 2
+    assert [task["id"] for task in everything] == sorted(aged_tasks)
+
+@pytest.mark.asyncio
+async def test_get_tasks_ordered_by_id(db_session, regular_user, aged_tasks):
+    archive_done_tasks(db_session, older_than_days=30)
+    # Обе ветки (горячая таблица и UNION ALL с архивом) - по id
+    hot = [task.id for task in get_tasks(db_session, owner_id=regular_user.id)]
+    assert hot == sorted(aged_tasks[2:])
+    pages = [
+        [task.id for task in get_tasks(db_session, skip=skip, limit=2, include_archived=True)]
+        for skip in (0, 2)
+    ]
+    assert pages == [sorted(aged_tasks)[:2], sorted(aged_tasks)[2:]]
+    with pytest.raises(ValueError):
+        get_tasks(db_session, include_archived=True, with_owner=True)
+
+@pytest.mark.asyncio
+async def test_analytics_totals_include_archive(db_session, test_client, user_token, regular_user, aged_tasks):
+    archive_done_tasks(db_session, older_than_days=30)
+    assert count_tasks_by_status(db_session, regular_user.id) == {"done": 3, "new": 1}
+    assert count_tasks_by_status(db_session, regular_user.id, include_archived=False) == {"done": 1, "new": 1}
+
+    df = load_tasks_frame(db_session, owner_id=regular_user.id, status="done")
+    assert sorted(df["id"]) == sorted(aged_tasks[:2] + aged_tasks[3:])
+    assert len(load_tasks_frame(db_session, include_archived=False)) == 2
+
+    exported = sum(batch.num_rows for batch in iter_task_batches(db_session, with_usernames=True))
+    assert exported == 4
+    assert sum(batch.num_rows for batch in iter_task_batches(db_session, include_archived=False)) == 2
+
+    table = test_client.get("/analytics/tasks-table", headers=user_token).json()
+    assert table["total"] == 4
+    hot = test_client.get("/analytics/tasks-table?include_archived=false", headers=user_token).json()
+    assert hot["total"] == 2
@@ -0,0 +1,76 @@
+import gzip
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from app.compression import CompressionMiddleware
+
+BIG_TEXT = "x" * 5000
+
+compress_app = FastAPI()
+compress_app.add_middleware(CompressionMiddleware, minimum_size=1024, use_brotli=False)
+
+@compress_app.get("/big")
+def big():
+    return PlainTextResponse(BIG_TEXT)
+
+@compress_app.get("/small")
+def small():
+    return PlainTextResponse("ok")
+
+@compress_app.get("/png")
+def png():
+    return Response(b"\x89PNG" + b"x" * 5000, media_type="image/png")
+
+@compress_app.get("/stream")
+def stream():
+    return StreamingResponse((BIG_TEXT for _ in range(3)), media_type="application/json")
+
+@pytest.fixture
+def compress_client():
+    return TestClient(compress_app)
+
+def test_big_response_gzipped(compress_client):
+    response = compress_client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(BIG_TEXT)
+    assert response.text == BIG_TEXT
+
+def test_small_response_not_compressed(compress_client):
+    response = compress_client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+def test_png_skipped(compress_client):
+    response = compress_client.get("/png", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+def test_no_accept_encoding(compress_client):
+    response = compress_client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+def test_streaming_response_gzipped(compress_client):
+    with compress_client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw).decode() == BIG_TEXT * 3
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    ("gzip;q=0.5, br;q=0", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=0.0", None),
+    ("gzip; q=0", None),
+    ("GZIP;Q=0.000", None),
+    ("gzip;q=bogus", None),
+    ("identity, gzip;q=0.001", "gzip"),
+])
+def test_select_encoding_quality(accept_encoding, expected):
+    middleware = CompressionMiddleware(compress_app, use_brotli=False)
+    assert middleware.select_encoding(accept_encoding) == expected
+
+def test_select_encoding_refused_brotli():
+    pytest.importorskip("brotli")
+    middleware = CompressionMiddleware(compress_app, use_brotli=True)
+    assert middleware.select_encoding("br;q=0.000, gzip") == "gzip"
+    assert middleware.select_encoding("br;q=0.8, gzip") == "br"
@@ -1,5 +1,5 @@
 import pytest
-from app.crud import get_tasks, create_task, get_task, update_task, delete_task
+from app.crud import get_tasks, create_task, get_task, update_task, delete_task, get_tasks_version, bump_tasks_versions
 from app.schemas import TaskCreate, TaskUpdate
 from app.models import User
 from app.auth import get_password_hash
@@ -43,3 +43,28 @@ async def test_delete_task(db_session, regular_user):
     delete_task(db_session, task)
     remaining_task = get_task(db_session, task_id)
     assert remaining_task is None
+
+@pytest.mark.asyncio
+async def test_update_task_bumps_version(db_session, regular_user):
+    task = create_task(db_session, TaskCreate(title="Versioned"), regular_user.id)
+    version = get_tasks_version(db_session, regular_user.id)
+    created_updated_at = task.updated_at
+    update_task(db_session, task, TaskUpdate(title="Changed"))
+    assert get_tasks_version(db_session, regular_user.id) == version + 1
+    assert task.updated_at >= created_updated_at
+
+@pytest.mark.asyncio
+async def test_global_tasks_version_monotonic(db_session, regular_user):
+    version = get_tasks_version(db_session)
+    create_task(db_session, TaskCreate(title="Counted"), regular_user.id)
+    assert get_tasks_version(db_session) == version + 1
+    # Удаление пользователя не уменьшает общий счётчик (прежняя сумма уменьшалась)
+    user = User(username="short_lived", hashed_password="x", tasks_version=5)
+    db_session.add(user)
+    db_session.commit()
+    db_session.delete(user)
+    db_session.commit()
+    assert get_tasks_version(db_session) == version + 1
+    bump_tasks_versions(db_session, [regular_user.id, regular_user.id, None])
+    assert get_tasks_version(db_session) == version + 2
+    assert get_tasks_version(db_session, regular_user.id) == 2
@@ -0,0 +1,67 @@
+import pytest
+from app.routers import health
+
+@pytest.fixture(autouse=True)
+def reset_readiness_cache():
+    health.readiness_cache.result = None
+    yield
+    health.readiness_cache.result = None
+
+@pytest.mark.asyncio
+async def test_liveness(test_client):
+    response = test_client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+@pytest.mark.asyncio
+async def test_readiness_ok(test_client):
+    response = test_client.get("/health/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["checks"]["database"]["status"] == "ok"
+    assert "latency_ms" in data["checks"]["database"]
+
+@pytest.mark.asyncio
+async def test_readiness_database_down(test_client, monkeypatch):
+    def broken_probe():
+        raise ConnectionError("db down")
+    monkeypatch.setattr(health, "_probe_database", broken_probe)
+    response = test_client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"]["error"] == "ConnectionError"
+
+@pytest.mark.asyncio
+async def test_readiness_pool_exhausted(test_client, monkeypatch):
+    monkeypatch.setattr(health, "pool_stats", lambda: {"saturation": 1.0})
+    response = test_client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"]["error"] == "pool exhausted"
+
+@pytest.mark.asyncio
+async def test_readiness_cached(test_client, monkeypatch):
+    assert test_client.get("/health/ready").status_code == 200
+    monkeypatch.setattr(health, "pool_stats", lambda: {"saturation": 1.0})
+    assert test_client.get("/health/ready").status_code == 200
+
+class _FakePool:
+    def __init__(self, checked_out, overflow):
+        self._checked_out = checked_out
+        self._overflow = overflow
+
+    def size(self):
+        return 5
+
+    def checkedout(self):
+        return self._checked_out
+
+    def overflow(self):
+        return self._overflow
+
+@pytest.mark.parametrize("max_overflow, checked_out, saturation", [(10, 15, 1.0), (10, 6, 0.4), (-1, 40, 0.0)])
+def test_pool_stats_capacity(monkeypatch, max_overflow, checked_out, saturation):
+    monkeypatch.setattr(health, "engine", type("Engine", (), {"pool": _FakePool(checked_out, checked_out - 5)}))
+    monkeypatch.setattr(health, "pool_options", {"pool_size": 5, "max_overflow": max_overflow})
+    monkeypatch.setattr(health.settings, "db_pool_size", 5)
+    monkeypatch.setattr(health.settings, "db_max_overflow", max_overflow)
+    assert health.pool_stats()["saturation"] == saturation
@@ -0,0 +1,87 @@
+import io
+import pytest
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+from app.loaders import load_tasks_frame
+from app.export import export_schema, iter_task_batches, stream_export, stream_task_export
+from app.crud import count_tasks_by_status, count_tasks_by_user
+from app.models import TaskStatus
+
+@pytest.mark.asyncio
+async def test_load_tasks_frame_empty(db_session):
+    df = load_tasks_frame(db_session)
+    assert len(df) == 0
+    assert list(df.columns) == ["id", "title", "status", "created_at", "owner_id"]
+
+@pytest.mark.asyncio
+async def test_load_tasks_frame_types(db_session, create_test_tasks, regular_user):
+    df = load_tasks_frame(db_session, owner_id=regular_user.id)
+    assert len(df) == 3
+    assert df["id"].dtype == "int64"
+    assert df["status"].dtype == "category"
+    assert list(df["status"]) == ["new", "in progress", "done"]
+    assert str(df["created_at"].dtype).startswith("datetime64")
+
+@pytest.mark.asyncio
+async def test_load_tasks_frame_status_filter(db_session, create_test_tasks):
+    df = load_tasks_frame(db_session, status="done")
+    assert list(df["title"]) == ["Task 3"]
+
+@pytest.mark.asyncio
+async def test_count_tasks(db_session, create_test_tasks, regular_user, admin_user):
+    assert count_tasks_by_status(db_session) == {"new": 1, "in progress": 1, "done": 1}
+    rows = dict(count_tasks_by_user(db_session, TaskStatus.in_progress))
+    assert rows == {"user_test": 1, "admin_test": 0}
+
+@pytest.mark.asyncio
+async def test_tasks_table_endpoint(test_client, user_token, create_test_tasks):
+    response = test_client.get("/analytics/tasks-table", headers=user_token)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert data["data"][1]["status"] == "in progress"
+
+@pytest.mark.asyncio
+async def test_tasks_export_parquet(test_client, user_token, create_test_tasks):
+    response = test_client.get("/analytics/tasks-export?format=parquet", headers=user_token)
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 3
+    assert pa.types.is_dictionary(table.schema.field("status").type)
+    assert table.column("status").to_pylist() == ["new", "in progress", "done"]
+
+@pytest.mark.asyncio
+async def test_tasks_export_arrow_usernames(test_client, admin_token, create_test_tasks):
+    response = test_client.get(
+        "/analytics/tasks-export?format=arrow&with_usernames=true", headers=admin_token
+    )
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("username").to_pylist() == ["user_test"] * 3
+
+@pytest.mark.asyncio
+async def test_tasks_export_date_filter(db_session, create_test_tasks):
+    batches = iter_task_batches(db_session, date_from=datetime(2100, 1, 1))
+    assert sum(batch.num_rows for batch in batches) == 0
+
+@pytest.mark.asyncio
+async def test_stream_export_no_empty_chunks(db_session, create_test_tasks):
+    for fmt in ("parquet", "arrow"):
+        batches = iter_task_batches(db_session, chunk_size=2)
+        chunks = list(stream_export(batches, fmt, export_schema()))
+        assert chunks and all(chunks)
+
+@pytest.mark.asyncio
+async def test_stream_task_export_closes_session(db_session, create_test_tasks):
+    sessions = []
+
+    def session_factory():
+        sessions.append(db_session)
+        return db_session
+
+    stream = stream_task_export(session_factory, "arrow")
+    next(stream)
+    stream.close()  # клиент оборвал соединение
+    assert len(sessions) == 1
+    assert not db_session.in_transaction()
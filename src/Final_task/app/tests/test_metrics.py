@@ -0,0 +1,21 @@
+import pytest
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(test_client):
+    test_client.get("/health")
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/health"}' in body
+    assert "http_requests_in_progress" in body
+    assert "threadpool_max_threads" in body
+
+@pytest.mark.asyncio
+async def test_metrics_etag_cache(test_client, user_token, create_test_tasks):
+    etag = test_client.get("/tasks/", headers=user_token).headers["etag"]
+    test_client.get("/tasks/", headers={**user_token, "If-None-Match": etag})
+    body = test_client.get("/metrics").text
+    assert 'cache_requests_total{cache="etag_tasks",result="hit"}' in body
+    assert 'cache_requests_total{cache="etag_tasks",result="miss"}' in body
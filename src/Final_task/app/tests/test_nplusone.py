@@ -0,0 +1,39 @@
+import logging
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.crud import create_task, get_tasks, get_users_with_tasks
+from app.models import User
+from app.schemas import TaskCreate
+from app.nplusone import NPlusOneError, install_lazy_load_detector, lazy_load_counts
+
+@pytest.fixture
+def two_owners(db_session, regular_user, admin_user):
+    for owner in (regular_user, admin_user):
+        create_task(db_session, TaskCreate(title=f"Task of {owner.username}"), owner.id)
+    db_session.expunge_all()
+
+@pytest.mark.asyncio
+async def test_lazy_owner_loop_raises(db_session, two_owners):
+    with pytest.raises(NPlusOneError, match="Task.owner"):
+        [task.owner.username for task in get_tasks(db_session)]
+
+@pytest.mark.asyncio
+async def test_eager_helpers_do_not_lazy_load(db_session, two_owners):
+    owners = [task.owner.username for task in get_tasks(db_session, with_owner=True)]
+    assert sorted(owners) == ["admin_test", "user_test"]
+    users = get_users_with_tasks(db_session)
+    assert sum(len(user.tasks) for user in users) == 2
+    assert lazy_load_counts(db_session) == {}
+
+@pytest.mark.asyncio
+async def test_log_mode_warns(db_session, two_owners, caplog):
+    session_factory = sessionmaker()
+    install_lazy_load_detector(session_factory, threshold=1)
+    session = session_factory(bind=db_session.connection())
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.nplusone"):
+            [len(user.tasks) for user in session.query(User).all()]
+        assert lazy_load_counts(session) == {"User.tasks": 2}
+        assert "N+1: User.tasks" in caplog.text
+    finally:
+        session.close()
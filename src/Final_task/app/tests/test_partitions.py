@@ -0,0 +1,140 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+import app.main
+from app.crud import get_tasks
+from app.models import Task
+from app.partitions import (
+    add_months, ensure_partitions, is_partitioned, list_partitions,
+    month_start, partition_month, partition_name,
+)
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+MIGRATION_SCHEMA = f"migrations_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}"
+
+
+@pytest.fixture
+def migrated_engine():
+    """Схема с alembic upgrade head (партиционированная tasks); только PostgreSQL"""
+    if not TEST_DATABASE_URL.startswith("postgresql"):
+        pytest.skip("миграции партиционирования - только для PostgreSQL (TEST_DATABASE_URL)")
+    from alembic import command
+    from alembic.config import Config
+
+    admin = create_engine(TEST_DATABASE_URL)
+    with admin.begin() as connection:
+        connection.execute(text(f'DROP SCHEMA IF EXISTS "{MIGRATION_SCHEMA}" CASCADE'))
+        connection.execute(text(f'CREATE SCHEMA "{MIGRATION_SCHEMA}"'))
+    separator = "&" if "?" in TEST_DATABASE_URL else "?"
+    url = f"{TEST_DATABASE_URL}{separator}options=-csearch_path%3D{MIGRATION_SCHEMA}"
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    # configparser: % в URL экранируется
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    command.upgrade(config, "head")
+    engine = create_engine(url)
+    try:
+        yield engine
+        engine.dispose()
+        command.downgrade(config, "base")
+    finally:
+        with admin.begin() as connection:
+            connection.execute(text(f'DROP SCHEMA IF EXISTS "{MIGRATION_SCHEMA}" CASCADE'))
+        admin.dispose()
+
+def test_partition_months():
+    month = month_start(datetime(2026, 11, 17, 8, 30))
+    assert month == datetime(2026, 11, 1)
+    assert add_months(month, 2) == datetime(2027, 1, 1)
+    assert add_months(month, -11) == datetime(2025, 12, 1)
+    assert partition_name(month) == "tasks_p202611"
+    assert partition_month("tasks_p202611") == month
+    assert partition_month("tasks_default") is None
+
+@pytest.mark.asyncio
+async def test_get_tasks_date_range(db_session, regular_user):
+    now = datetime(2026, 10, 15)
+    for days in (0, 40, 80):
+        db_session.add(Task(title=f"{days} days ago", owner_id=regular_user.id,
+                            created_at=now - timedelta(days=days)))
+    db_session.commit()
+    tasks = get_tasks(db_session, owner_id=regular_user.id,
+                      date_from=now - timedelta(days=60), date_to=now)
+    assert [task.title for task in tasks] == ["40 days ago"]
+
+@pytest.mark.asyncio
+async def test_read_tasks_date_filter(test_client, user_token, create_test_tasks):
+    response = test_client.get("/tasks/?date_from=2000-01-01T00:00:00", headers=user_token)
+    assert len(response.json()) == 3
+    response = test_client.get("/tasks/?date_to=2000-01-01T00:00:00", headers=user_token)
+    assert response.json() == []
+
+def test_startup_survives_partition_errors(monkeypatch, caplog):
+    def fail(connection, months_ahead):
+        raise exc.OperationalError("CREATE TABLE tasks_p202610", {}, Exception("rows in tasks_default"))
+
+    monkeypatch.setattr(app.main, "is_partitioned", lambda connection: True)
+    monkeypatch.setattr(app.main, "ensure_partitions", fail)
+    with caplog.at_level(logging.ERROR, logger="app.main"):
+        with TestClient(app.main.app) as client:
+            assert client.get("/health/live").status_code == 200
+    assert "не удалось создать партиции tasks" in caplog.text
+
+def test_migrated_tasks_keep_unique_ids(migrated_engine):
+    now = datetime.utcnow()
+    with migrated_engine.begin() as connection:
+        assert is_partitioned(connection)
+        assert partition_name(month_start(now)) in list_partitions(connection)
+        assert "tasks_default" in list_partitions(connection)
+        # Повторный запуск (второй воркер) ничего не создаёт и не падает
+        assert ensure_partitions(connection, months_ahead=3, now=now) == []
+        owner_id = connection.execute(
+            text("INSERT INTO users (username, hashed_password) VALUES ('owner', 'x') RETURNING id")
+        ).scalar()
+        task_id = connection.execute(
+            text("INSERT INTO tasks (title, owner_id, created_at) VALUES ('a', :owner, :at) RETURNING id"),
+            {"owner": owner_id, "at": now},
+        ).scalar()
+        # Merge bulk_load: ON CONFLICT по первичному ключу партиционированной таблицы
+        inserted = connection.execute(
+            text("INSERT INTO tasks (id, title, created_at) VALUES (:id, 'b', :at) "
+                 "ON CONFLICT (id, created_at) DO NOTHING"),
+            {"id": task_id, "at": now},
+        ).rowcount
+        assert inserted == 0
+        # Перенос в другую партицию (смена created_at) id не дублирует
+        connection.execute(
+            text("UPDATE tasks SET created_at = :at WHERE id = :id"),
+            {"id": task_id, "at": now - timedelta(days=400)},
+        )
+
+    # Тот же id в другом месяце - другой первичный ключ, но дубликат id
+    with pytest.raises(exc.IntegrityError):
+        with migrated_engine.begin() as connection:
+            connection.execute(
+                text("INSERT INTO tasks (id, title, created_at) VALUES (:id, 'c', :at)"),
+                {"id": task_id, "at": now},
+            )
+
+    # id удалённой или архивированной задачи не освобождается: повторная вставка -
+    # дубликат, а не вторая копия id рядом с tasks_archive
+    with migrated_engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO tasks_archive (id, title, created_at) "
+                 "SELECT id, title, created_at FROM tasks WHERE id = :id"),
+            {"id": task_id},
+        )
+        connection.execute(text("DELETE FROM tasks WHERE id = :id"), {"id": task_id})
+        assert connection.execute(
+            text("SELECT count(*) FROM task_ids WHERE id = :id"), {"id": task_id}
+        ).scalar() == 1
+    with pytest.raises(exc.IntegrityError):
+        with migrated_engine.begin() as connection:
+            connection.execute(
+                text("INSERT INTO tasks (id, title, created_at) VALUES (:id, 'd', :at)"),
+                {"id": task_id, "at": now},
+            )
@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from app.profiling import RequestStats, SQLProfilingMiddleware, SQLProfileRegistry, current_request_stats
+
+@pytest.fixture
+def profiled_client(test_client):
+    registry = SQLProfileRegistry()
+    with TestClient(SQLProfilingMiddleware(app, registry=registry)) as client:
+        yield client, registry
+
+@pytest.mark.asyncio
+async def test_server_timing_header(profiled_client, db_session, user_token, create_test_tasks):
+    client, registry = profiled_client
+    # SAVEPOINT тестовой сессии открывается заранее и не попадает в счётчик
+    db_session.connection()
+    response = client.get("/tasks/", headers=user_token)
+    assert response.status_code == 200
+    server_timing = response.headers["server-timing"]
+    assert server_timing.startswith("db;dur=")
+    assert "app;dur=" in server_timing
+
+    routes = registry.snapshot()
+    profile = routes["GET /tasks/"]
+    assert profile["requests"] == 1
+    # пользователь + версия списка + задачи
+    assert profile["max_queries"] == 3
+
+@pytest.mark.asyncio
+async def test_routes_grouped_by_template(profiled_client, user_token, create_test_tasks):
+    client, registry = profiled_client
+    for task in create_test_tasks:
+        client.get(f"/tasks/{task.id}", headers=user_token)
+    assert registry.snapshot()["GET /tasks/{task_id}"]["requests"] == 3
+
+@pytest.mark.asyncio
+async def test_failed_statement_counted_once(db_session):
+    connection = db_session.connection()
+    # SAVEPOINT: в Postgres ошибка иначе прерывает всю транзакцию теста
+    savepoint = connection.begin_nested()
+    stats = RequestStats()
+    token = current_request_stats.set(stats)
+    try:
+        with pytest.raises(DBAPIError):
+            connection.execute(text("SELECT * FROM no_such_table"))
+        assert (stats.queries, stats.errors, stats.rows) == (1, 1, 0)
+        assert stats.db_time > 0
+        savepoint.rollback()
+        # Следующий запрос на том же соединении учитывается отдельно и успешным
+        queries = stats.queries
+        connection.execute(text("SELECT 1"))
+        assert (stats.queries, stats.errors) == (queries + 1, 1)
+    finally:
+        current_request_stats.reset(token)
+        if savepoint.is_active:
+            savepoint.rollback()
+    registry = SQLProfileRegistry()
+    registry.record("GET /failing", stats)
+    assert registry.snapshot()["GET /failing"]["errors"] == 1
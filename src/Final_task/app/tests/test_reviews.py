@@ -0,0 +1,159 @@
+import pytest
+from app.config import settings
+from app.reviews import products_report_pipeline
+
+@pytest.mark.asyncio
+async def test_reviews_not_configured(test_client, user_token, monkeypatch):
+    monkeypatch.setattr(settings, "mongo_url", None)
+    response = test_client.get("/reviews/products?product_id=1&product_id=2", headers=user_token)
+    assert response.status_code == 503
+
+def test_products_pipeline_single_match():
+    pipeline = products_report_pipeline(["1", "2"])
+    assert pipeline[0] == {"$match": {"order_data.product_id": {"$in": ["1", "2"]}}}
+    assert pipeline[1]["$project"]["_id"] == 0
+
+
+# Заглушка AsyncMongoClient: запоминает, к какой коллекции и каким методом
+# обратился отчёт, и возвращает заданные документы
+
+class StubCursor:
+    def __init__(self, documents):
+        self._documents = list(documents)
+
+    def sort(self, *args):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self._documents:
+            yield document
+
+    async def to_list(self, length=None):
+        return self._documents
+
+
+class StubCollection:
+    def __init__(self, name, calls, documents):
+        self.name = name
+        self._calls = calls
+        self._documents = documents
+
+    def find(self, query):
+        self._calls.append((self.name, "find", query))
+        return StubCursor(self._documents.get(self.name, []))
+
+    async def aggregate(self, pipeline, **kwargs):
+        self._calls.append((self.name, "aggregate", pipeline[0]["$match"]))
+        if isinstance(self._documents, Exception):
+            raise self._documents
+        product_ids = pipeline[0]["$match"]["order_data.product_id"]["$in"]
+        return StubCursor(
+            {"_id": product_id, "total_reviews": 1} for product_id in product_ids
+        )
+
+
+class StubAsyncMongoClient:
+    instances = []
+    # Документы по "<бд>.<коллекция>" или исключение, которое бросит aggregate
+    documents = {}
+
+    def __init__(self, url, **kwargs):
+        self.url = url
+        self.kwargs = kwargs
+        self.calls = []
+        self.closed = False
+        StubAsyncMongoClient.instances.append(self)
+
+    def __getitem__(self, db_name):
+        client = self
+
+        class Database:
+            def __getitem__(self, name):
+                return StubCollection(f"{db_name}.{name}", client.calls, client.documents)
+
+        return Database()
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    import app.reviews as reviews
+    StubAsyncMongoClient.instances = []
+    StubAsyncMongoClient.documents = {}
+    monkeypatch.setattr(reviews, "AsyncMongoClient", StubAsyncMongoClient)
+    monkeypatch.setattr(reviews, "_client", None)
+    monkeypatch.setattr(settings, "mongo_url", "mongodb://stub")
+    monkeypatch.setattr(settings, "mongo_db", "shop")
+    yield lambda: StubAsyncMongoClient.instances[-1]
+
+
+def report(test_client, user_token, mode=None):
+    url = "/reviews/products?product_id=2&product_id=1"
+    if mode:
+        url += f"&mode={mode}"
+    return test_client.get(url, headers=user_token)
+
+
+def test_report_mode_rollups_default(test_client, user_token, mongo):
+    StubAsyncMongoClient.documents = {"shop.reviews_by_product": [
+        {"_id": "1", "count": 2, "sum": 14, "min": 6, "max": 8},
+    ]}
+    response = report(test_client, user_token)
+    assert response.status_code == 200
+    assert response.json() == [
+        {"_id": "1", "total_reviews": 2, "average_rating": 7.0, "min_rating": 6, "max_rating": 8},
+    ]
+    # Только готовые агрегаты, отзывы не читаются
+    client = mongo()
+    assert {call[:2] for call in client.calls} == {("shop.reviews_by_product", "find")}
+    assert client.calls[-1][2] == {"_id": {"$in": ["2", "1"]}}
+
+
+def test_report_mode_pipeline_single_aggregate(test_client, user_token, mongo):
+    response = report(test_client, user_token, "pipeline")
+    assert response.status_code == 200
+    assert [row["_id"] for row in response.json()] == ["2", "1"]
+    assert mongo().calls == [
+        ("shop.reviews", "aggregate", {"order_data.product_id": {"$in": ["2", "1"]}}),
+    ]
+
+
+def test_report_mode_concurrent_aggregate_per_product(test_client, user_token, mongo):
+    response = report(test_client, user_token, "concurrent")
+    assert response.status_code == 200
+    assert sorted(row["_id"] for row in response.json()) == ["1", "2"]
+    calls = mongo().calls
+    assert [call[:2] for call in calls] == [("shop.reviews", "aggregate")] * 2
+    assert sorted(call[2]["order_data.product_id"]["$in"][0] for call in calls) == ["1", "2"]
+
+
+def test_report_unknown_mode_rejected(test_client, user_token, mongo):
+    assert report(test_client, user_token, "secondary").status_code == 422
+    # Запрос к MongoDB не отправлен
+    assert all(not client.calls for client in StubAsyncMongoClient.instances)
+
+
+@pytest.mark.asyncio
+async def test_mongo_client_shared_and_closed(test_client, user_token, mongo):
+    from app.reviews import close_mongo_client
+    report(test_client, user_token, "pipeline")
+    report(test_client, user_token, "concurrent")
+    # Один клиент (и пул соединений) на процесс, с настройками пула
+    assert len(StubAsyncMongoClient.instances) == 1
+    client = mongo()
+    assert client.url == "mongodb://stub"
+    assert client.kwargs["maxPoolSize"] == settings.mongo_max_pool_size
+    await close_mongo_client()
+    assert client.closed
+
+
+def test_mongo_errors_mapped_to_503(test_client, user_token, mongo):
+    from pymongo.errors import ServerSelectionTimeoutError
+    StubAsyncMongoClient.documents = ServerSelectionTimeoutError("no servers")
+    assert report(test_client, user_token, "pipeline").status_code == 503
+    assert test_client.get("/reviews/products/1", headers=user_token).status_code == 503
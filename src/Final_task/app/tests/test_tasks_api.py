@@ -1,4 +1,6 @@
 import pytest
+from typing import List
+from app.schemas import Task
 
 @pytest.mark.asyncio
 async def test_create_task_user(test_client, user_token, regular_user):
@@ -23,3 +25,68 @@ async def test_get_tasks_user(test_client, user_token, create_test_tasks):
 async def test_create_task_unauth(test_client):
     response = test_client.post("/tasks/", json={"title": "Test"})
     assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_get_tasks_matches_schema(test_client, user_token, create_test_tasks):
+    response = test_client.get("/tasks/", headers=user_token)
+    assert response.headers["content-type"] == "application/json"
+    expected = [Task.model_validate(t).model_dump(mode="json") for t in create_test_tasks]
+    assert response.json() == expected
+
+@pytest.mark.asyncio
+async def test_get_task_not_modified(test_client, user_token, create_test_tasks):
+    task_id = create_test_tasks[0].id
+    response = test_client.get(f"/tasks/{task_id}", headers=user_token)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert "last-modified" in response.headers
+
+    response = test_client.get(f"/tasks/{task_id}", headers={**user_token, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    test_client.put(f"/tasks/{task_id}", json={"status": "done"}, headers=user_token)
+    response = test_client.get(f"/tasks/{task_id}", headers={**user_token, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["status"] == "done"
+
+@pytest.mark.asyncio
+async def test_get_tasks_not_modified(test_client, user_token, create_test_tasks):
+    etag = test_client.get("/tasks/", headers=user_token).headers["etag"]
+    response = test_client.get("/tasks/", headers={**user_token, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    test_client.post("/tasks/", json={"title": "New"}, headers=user_token)
+    response = test_client.get("/tasks/", headers={**user_token, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 4
+
+@pytest.mark.asyncio
+async def test_fast_path_matches_response_model(db_session, create_test_tasks, regular_user):
+    # Те же байты, что у сериализации response_model - для ORM-объектов и строк UNION ALL
+    from pydantic import TypeAdapter
+    from app.crud import get_tasks
+    from app.responses import tasks_json_response
+    adapter = TypeAdapter(List[Task])
+    for include_archived in (False, True):
+        tasks = get_tasks(db_session, owner_id=regular_user.id, include_archived=include_archived)
+        expected = adapter.dump_json(adapter.validate_python(tasks, from_attributes=True))
+        assert tasks_json_response(tasks).body == expected
+
+@pytest.mark.asyncio
+async def test_fast_path_validates_fields(db_session, create_test_tasks):
+    from pydantic import ValidationError
+    from app.responses import task_json_response
+    task = create_test_tasks[0]
+    task.status = "bogus"  # не член TaskStatus - ответ не уходит без проверки
+    with pytest.raises(ValidationError):
+        task_json_response(task)
+    db_session.rollback()
+
+@pytest.mark.asyncio
+async def test_tasks_openapi_schema(test_client):
+    paths = test_client.get("/openapi.json").json()["paths"]
+    schema = paths["/tasks/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema["items"]["$ref"].endswith("/Task")
+    schema = paths["/tasks/{task_id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema["$ref"].endswith("/Task")
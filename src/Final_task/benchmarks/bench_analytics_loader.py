@@ -0,0 +1,100 @@
+"""
+Микро-бенчмарк загрузки задач в DataFrame для аналитики.
+
+Сравнивает старый путь (ORM-объекты + словарь на строку) с колоночным
+загрузчиком app.loaders.load_tasks_frame.
+
+Таблицы создаются в одноразовой БД/схеме (benchmarks.scratch), рабочая
+база из --database-url не затрагивается.
+
+Запуск из src/Final_task:
+    python -m benchmarks.bench_analytics_loader --rows 200000
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from benchmarks.scratch import scratch_engine
+from app.loaders import load_tasks_frame
+from app.models import Task, TaskStatus, User
+
+STATUSES = list(TaskStatus)
+
+
+def seed(session, rows: int, users: int = 50):
+    session.execute(
+        insert(User),
+        [{"username": f"user_{i}", "hashed_password": "x"} for i in range(users)],
+    )
+    session.execute(
+        insert(Task),
+        [
+            {
+                "title": f"Task {i}",
+                "status": STATUSES[i % len(STATUSES)],
+                "owner_id": i % users + 1,
+            }
+            for i in range(rows)
+        ],
+    )
+    session.commit()
+
+
+def load_with_dicts(session) -> pd.DataFrame:
+    tasks = session.query(Task).all()
+    return pd.DataFrame(
+        [
+            {
+                "id": t.id,
+                "title": t.title,
+                "status": t.status.value,
+                "created_at": t.created_at,
+                "owner_id": t.owner_id,
+            }
+            for t in tasks
+        ]
+    )
+
+
+def measure(name, func, session, rows: int, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        session.expunge_all()
+        start = time.perf_counter()
+        df = func(session)
+        best = min(best, time.perf_counter() - start)
+    assert len(df) == rows
+    print(f"{name:<12} {best * 1000:10.1f} ms  {rows / best:14,.0f} rows/sec")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+
+    with scratch_engine(args.database_url) as engine:
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        try:
+            seed(session, args.rows)
+            print(f"rows: {args.rows}, best of {args.repeat}")
+            before = measure("orm+dicts", load_with_dicts, session, args.rows, args.repeat)
+            after = measure("columnar", load_tasks_frame, session, args.rows, args.repeat)
+            print(f"speedup: {before / after:.1f}x")
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Бенчмарк сериализации списка задач.
+
+Сравнивает стандартный путь FastAPI (response_model -> validate -> serialize
+-> JSONResponse / ORJSONResponse) с быстрым путём app.responses.tasks_json_response
+(поля ORM-объектов словарями в TypeAdapter: одна проверка схемой и dump_json).
+Задачи читаются из SQLite в памяти, как в обработчике - у ORM-объектов
+загружены все колонки.
+
+Запуск из src/Final_task:
+    python -m benchmarks.bench_serialization --sizes 100 1000 10000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import Task, TaskStatus, User
+from app.responses import tasks_json_response
+from app.schemas import Task as TaskSchema
+
+STATUSES = list(TaskStatus)
+
+loop = asyncio.new_event_loop()
+
+response_field = create_model_field(
+    name="Response", type_=List[TaskSchema], mode="serialization"
+)
+
+
+def make_tasks(size: int) -> List[Task]:
+    """Задачи, загруженные из БД (как их отдаёт crud.get_tasks)"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        session.execute(insert(User), [{"username": f"user_{i}", "hashed_password": "x"} for i in range(50)])
+        session.execute(
+            insert(Task),
+            [
+                {
+                    "title": f"Task {i}",
+                    "description": "some description",
+                    "status": STATUSES[i % len(STATUSES)],
+                    "owner_id": i % 50 + 1,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(size)
+            ],
+        )
+        session.commit()
+        tasks = session.query(Task).order_by(Task.id).all()
+        session.expunge_all()
+    return tasks
+
+
+def fastapi_path(response_class):
+    def render(tasks):
+        content = loop.run_until_complete(
+            serialize_response(field=response_field, response_content=tasks)
+        )
+        return response_class(content).body
+
+    return render
+
+
+def fast_path(tasks):
+    return tasks_json_response(tasks).body
+
+
+def measure(func, tasks, repeat: int) -> float:
+    """Медиана по repeat замерам (минимум слишком чувствителен к шуму)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(tasks)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+
+    paths = {
+        "fastapi+json": fastapi_path(JSONResponse),
+        "fastapi+orjson": fastapi_path(ORJSONResponse),
+        "fast path": fast_path,
+    }
+    print(f"{'tasks':>8} " + " ".join(f"{name:>16}" for name in paths))
+    for size in args.sizes:
+        tasks = make_tasks(size)
+        timings = [measure(func, tasks, args.repeat) for func in paths.values()]
+        print(f"{size:>8} " + " ".join(f"{t * 1000:13.2f} ms" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Одноразовая БД для бенчмарков: таблицы создаются и удаляются только в ней,
+чтобы drop_all не мог задеть рабочую базу из --database-url.
+
+- sqlite:// (память) - как есть
+- sqlite:///path - только новый файл; по завершении удаляется
+- postgresql://... - отдельная схема bench_<pid> (search_path), по завершении DROP SCHEMA
+- остальное - отказ
+"""
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+
+@contextmanager
+def scratch_engine(database_url: str):
+    """Engine на одноразовой БД/схеме; metadata.create_all/drop_all - только в ней"""
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        path = Path(url.database) if url.database and url.database != ":memory:" else None
+        if path is not None and path.exists():
+            raise SystemExit(f"{path} уже существует - бенчмарк пишет только в новый файл")
+        engine = create_engine(url)
+        try:
+            yield engine
+        finally:
+            engine.dispose()
+            if path is not None:
+                path.unlink(missing_ok=True)
+        return
+    if url.get_backend_name() != "postgresql":
+        raise SystemExit(f"{url.get_backend_name()}: поддерживаются только sqlite и postgresql")
+
+    schema = f"bench_{os.getpid()}"
+    admin = create_engine(url)
+    with admin.begin() as connection:
+        connection.execute(text(f'CREATE SCHEMA "{schema}"'))
+    # Таблицы и enum-типы создаются в схеме бенчмарка (первой в search_path)
+    engine = create_engine(url, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as connection:
+            connection.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        admin.dispose()
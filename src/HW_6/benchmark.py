@@ -0,0 +1,60 @@
+"""
+Бенчмарк обработчика "/" (нужны запущенные Postgres и Redis, см. docker-compose.yaml).
+
+before - прежняя логика: новое соединение psycopg2 на запрос + INCR и GET в Redis
+after  - app.read_root: пул соединений, кешированная версия сервера,
+         пакетный счётчик посещений (BatchedCounter)
+
+Запуск:
+    POSTGRES_URL=... REDIS_URL=... python benchmark.py --requests 2000 --concurrency 20
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+import app as service
+
+
+def legacy_read_root():
+    conn = psycopg2.connect(service.POSTGRES_URL)
+    cur = conn.cursor()
+    cur.execute("SELECT version();")
+    db_version = cur.fetchone()
+    cur.close()
+    conn.close()
+
+    service.redis_client.incr("visit_count")
+    visit_count = service.redis_client.get("visit_count") or "0"
+    return {"postgres_version": db_version[0], "visit_count": visit_count}
+
+
+def measure(name, handler, requests, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started = time.perf_counter()
+        for _ in executor.map(lambda _: handler(), range(requests)):
+            pass
+        elapsed = time.perf_counter() - started
+    print(f"{name:<8} {elapsed:8.2f} s  {requests / elapsed:10.1f} req/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк обработчика /")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    service.get_postgres_version()
+    try:
+        before = measure("before", legacy_read_root, args.requests, args.concurrency)
+        after = measure("after", service.read_root, args.requests, args.concurrency)
+        print(f"speedup: {before / after:.1f}x")
+    finally:
+        service.visit_counter.stop()
+        service.db_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import threading
+
+
+class BatchedCounter:
+    """
+    Счётчик в Redis с накоплением приращений в процессе.
+
+    - incr() и value() не обращаются к Redis: значение - последняя сумма
+      из Redis плюс ещё не отправленные приращения этого процесса
+    - фоновый поток раз в flush_interval секунд (или раньше, при flush_size
+      накопленных приращений) отправляет INCRBY и чтение всех шардов одним pipeline
+    - при shards > 1 каждая отправка идёт в следующий шард key:<n> по кругу
+      (начальный - по pid), значение счётчика - сумма шардов: горячий ключ
+      размазывается по N ключам и внутри одного процесса
+    - без запущенного потока (скрипты) отправка при flush_size идёт в вызывающем потоке
+    """
+
+    def __init__(self, client, key, shards=1, flush_interval=1.0, flush_size=100):
+        self.client = client
+        self.shard_keys = [key] if shards <= 1 else [f"{key}:{n}" for n in range(shards)]
+        self._next_shard = os.getpid() % len(self.shard_keys)
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = 0
+        self._total = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def incr(self, amount=1):
+        """Увеличивает счётчик и возвращает приблизительное значение"""
+        with self._lock:
+            self._pending += amount
+            should_flush = self._pending >= self.flush_size
+        if should_flush:
+            if self._thread is not None:
+                self._wake.set()
+            else:
+                self._try_flush()
+        return self.value()
+
+    def value(self):
+        with self._lock:
+            return self._total + self._pending
+
+    def _try_flush(self):
+        # Ошибка Redis не должна ронять запрос: приращения останутся в _pending
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Ошибка отправки счётчика {self.shard_keys[0]}: {e}")
+
+    def flush(self):
+        """Отправляет накопленное и обновляет сумму шардов за один round-trip"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, 0
+            pipe = self.client.pipeline(transaction=False)
+            if pending:
+                pipe.incrby(self.shard_keys[self._next_shard], pending)
+                self._next_shard = (self._next_shard + 1) % len(self.shard_keys)
+            pipe.mget(self.shard_keys)
+            try:
+                results = pipe.execute()
+            except Exception:
+                # Redis недоступен - приращения не теряем, отправим в следующий раз
+                with self._lock:
+                    self._pending += pending
+                raise
+            total = sum(int(value or 0) for value in results[-1])
+            with self._lock:
+                self._total = total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self._stop.is_set():
+                self._try_flush()
+
+    def start(self):
+        """Фоновый поток периодической отправки"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Останавливает фоновый поток и отправляет остаток"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
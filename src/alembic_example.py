@@ -1,5 +1,5 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey
-from sqlalchemy.orm import DeclarativeBase, relationship, sessionmaker
+from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, delete
+from sqlalchemy.orm import DeclarativeBase, relationship, sessionmaker, selectinload, joinedload
 from sqlalchemy.exc import SQLAlchemyError
 
 # Создаем базовый класс с помощью DeclarativeBase
@@ -19,7 +19,8 @@ class User(Base):
     email = Column(String(100), unique=True, nullable=False)
     age = Column(Integer, nullable=True)
 
-    posts = relationship('Post', back_populates='user', cascade="all, delete")
+    # passive_deletes: посты удаляет ON DELETE CASCADE в БД, ORM их не загружает
+    posts = relationship('Post', back_populates='user', cascade="all, delete", passive_deletes=True)
 
 # ORM-модель Post (связь с User через user_id)
 class Post(Base):
@@ -28,7 +29,9 @@ class Post(Base):
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
     content = Column(String)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey('users.id', ondelete='CASCADE', name='posts_user_id_fkey'), nullable=False, index=True
+    )
 
     user = relationship('User', back_populates='posts')
 
@@ -71,6 +74,35 @@ def read_user(user_id):
     finally:
         session.close()
 
+def read_users_with_posts(limit=None):
+    # Посты всех пользователей вторым запросом WHERE user_id IN (...),
+    # а не отдельным SELECT на каждого пользователя при обращении к user.posts
+    session = Session()
+    try:
+        query = session.query(User).options(selectinload(User.posts)).order_by(User.id)
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+    except SQLAlchemyError as e:
+        print(f"Error reading users with posts: {e}")
+        return []
+    finally:
+        session.close()
+
+def read_posts_with_users(limit=None):
+    # Автор поста тем же запросом (JOIN users) - post.user доступен после закрытия сессии
+    session = Session()
+    try:
+        query = session.query(Post).options(joinedload(Post.user)).order_by(Post.id)
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+    except SQLAlchemyError as e:
+        print(f"Error reading posts with users: {e}")
+        return []
+    finally:
+        session.close()
+
 def update_user(user_id, name=None, email=None, age=None):
     session = Session()
     try:
@@ -99,7 +131,7 @@ def delete_user(user_id):
         if not user:
             print("User not found")
             return
-        session.delete(user)  # Каскадное удаление связанных posts
+        session.delete(user)  # Посты удаляет ON DELETE CASCADE (без загрузки в память)
         session.commit()
         print(f"Deleted user with id: {user_id} and their posts")
     except SQLAlchemyError as e:
@@ -108,6 +140,21 @@ def delete_user(user_id):
     finally:
         session.close()
 
+def delete_users(user_ids):
+    # Один DELETE ... WHERE id IN (...) на всех пользователей, посты - каскадом в БД
+    session = Session()
+    try:
+        result = session.execute(delete(User).where(User.id.in_(list(user_ids))))
+        session.commit()
+        print(f"Deleted {result.rowcount} users and their posts")
+        return result.rowcount
+    except SQLAlchemyError as e:
+        session.rollback()
+        print(f"Error deleting users: {e}")
+        return 0
+    finally:
+        session.close()
+
 # Пример использования функций
 if __name__ == "__main__":
     create_user("Alice", "alice3@example.com", 30)
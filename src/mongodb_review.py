@@ -1,50 +1,458 @@
+import argparse
+import math
+import os
+import time
 import uuid
 import random
-from pymongo import MongoClient, ASCENDING
-
-def generate_test_data():
-    with MongoClient("mongodb://localhost:27017/") as client:
-        db = client["customer"]
-        collection = db["reviews"]
-        collection.drop()
-        for i in range(1000):
-            id = str(uuid.uuid4())
-            review_dict = {
-                "_id": id,
-                "user_id": str(random.randint(1, 10)),
-                "order_data": {
-                    "order_id": str(uuid.uuid4()),
-                    "product_id": str(random.randint(1, 10))
-                },
-                "rating": random.randint(1, 10),
-                "content": "some text"
-            }
-            collection.update_one(filter={"_id": id}, update={"$set": review_dict}, upsert=True)
-        collection.create_index([("user_id", ASCENDING)])
-        collection.create_index([("order_data.product_id", ASCENDING)])
-        collection.create_index([("rating", ASCENDING)])
-        print('Generated test data and created indexes')
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+MONGO_URL = "mongodb://localhost:27017/"
+
+# Клиент на процесс-воркер (MongoClient нельзя передавать между процессами)
+_worker_client = None
+
+
+def _get_worker_client(connection_string):
+    global _worker_client
+    if _worker_client is None:
+        _worker_client = MongoClient(connection_string)
+    return _worker_client
+
+
+def build_reviews(batch_index, batch_size, seed=None, users=10, products=10):
+    """
+    Пачка документов; при заданном seed одна и та же пачка
+    (включая _id) воспроизводится независимо от числа воркеров
+    """
+    rng = random.Random(None if seed is None else f"{seed}:{batch_index}")
+    reviews = []
+    for _ in range(batch_size):
+        reviews.append({
+            "_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "user_id": str(rng.randint(1, users)),
+            "order_data": {
+                "order_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "product_id": str(rng.randint(1, products))
+            },
+            "rating": rng.randint(1, 10),
+            "content": "some text"
+        })
+    return reviews
+
+
+def _write_batch(connection_string, db_name, collection_name, batch_index, batch_size,
+                 seed, users, products, upsert):
+    collection = _get_worker_client(connection_string)[db_name][collection_name]
+    reviews = build_reviews(batch_index, batch_size, seed, users, products)
+    if upsert:
+        # Повторный запуск с тем же seed перезаписывает те же документы;
+        # неизменённый документ тоже записан (matched), хотя modified_count его не считает
+        result = collection.bulk_write(
+            [ReplaceOne({"_id": review["_id"]}, review, upsert=True) for review in reviews],
+            ordered=False,
+        )
+        return result.matched_count + result.upserted_count
+    return len(collection.insert_many(reviews, ordered=False).inserted_ids)
+
+
+def create_review_indexes(collection):
+    collection.create_index([("user_id", ASCENDING), ("rating", ASCENDING)])
+    # Покрывающий индекс для отчёта по товару: $match и $group читают только индекс.
+    # Заменяет одиночный индекс по order_data.product_id (тот же префикс)
+    collection.create_index([("order_data.product_id", ASCENDING), ("rating", ASCENDING)])
+    collection.create_index([("rating", ASCENDING)])
+
+
+def _winning_plan_stages(explain):
+    """Стадии выигравших планов из вывода explain (find или aggregate)"""
+    stages = []
+
+    def walk(node, in_plan):
+        if isinstance(node, dict):
+            if in_plan and "stage" in node:
+                stages.append(node["stage"])
+            for key, value in node.items():
+                walk(value, in_plan or key in ("winningPlan", "queryPlan"))
+        elif isinstance(node, list):
+            for value in node:
+                walk(value, in_plan)
+
+    walk(explain, False)
+    return stages
+
+
+def generate_test_data(count=1000, batch_size=10_000, workers=None, seed=None, users=10,
+                       products=10, connection_string=MONGO_URL, db_name="customer",
+                       collection_name="reviews", drop=True, upsert=False, rollups=True):
+    """
+    Генерирует count отзывов пачками по batch_size в пуле процессов
+    (неупорядоченные insert_many, при upsert - bulk_write ReplaceOne).
+    Индексы и rollup-агрегаты строятся один раз после загрузки - так быстрее,
+    чем поддерживать их на каждой вставке. Возвращает скорость, документов/с.
+    """
+    workers = workers or os.cpu_count()
+    with MongoClient(connection_string) as client:
+        collection = client[db_name][collection_name]
+        if drop:
+            collection.drop()
+
+        batches = [(index, min(batch_size, count - start))
+                   for index, start in enumerate(range(0, count, batch_size))]
+        written = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_write_batch, connection_string, db_name, collection_name,
+                                index, size, seed, users, products, upsert)
+                for index, size in batches
+            ]
+            for future in as_completed(futures):
+                written += future.result()
+                elapsed = time.perf_counter() - started
+                print(f"{written:,}/{count:,} документов, {written / elapsed:,.0f} док/с")
+        load_time = time.perf_counter() - started
+
+        create_review_indexes(collection)
+        if rollups:
+            # Генератор пишет в обход add_reviews - агрегаты пересчитываются целиком
+            MongoReviews(connection_string, db_name, collection_name).rebuild_rollups()
+        total_time = time.perf_counter() - started
+        rate = written / load_time
+        print(f"Generated {written:,} reviews in {load_time:.1f} s ({rate:,.0f} docs/s), "
+              f"indexes and rollups built in {total_time - load_time:.1f} s")
+        return rate
+
+
+# Поля группировки отзывов для rollup-коллекций
+ROLLUP_KEYS = {
+    "user": "user_id",
+    "product": "order_data.product_id",
+}
+
+
+def _rollup_key(review, field):
+    value = review
+    for part in field.split("."):
+        value = value[part]
+    return value
+
+
+def _rollup_update(count, total, min_rating, max_rating, histogram):
+    """$inc/$min/$max upsert: документ rollup создаётся при первом отзыве"""
+    inc = {"count": count, "sum": total}
+    for rating, n in histogram.items():
+        inc[f"histogram.{rating}"] = n
+    return {"$inc": inc, "$min": {"min": min_rating}, "$max": {"max": max_rating}}
+
+
+def histogram_quantile(histogram: dict, q: float):
+    """
+    Квантиль по гистограмме оценок (nearest-rank): наименьшая оценка,
+    до которой включительно набирается ceil(q * n) отзывов
+    """
+    counts = sorted((int(rating), n) for rating, n in histogram.items() if n > 0)
+    total = sum(n for _, n in counts)
+    if not total:
+        return None
+    rank = max(1, math.ceil(q * total))
+    cumulative = 0
+    for rating, n in counts:
+        cumulative += n
+        if cumulative >= rank:
+            return rating
+    return counts[-1][0]
+
+
+def group_reviews(reviews, field):
+    """Пачка отзывов -> {ключ: аргументы _rollup_update}: одна операция на ключ"""
+    groups = {}
+    for review in reviews:
+        rating = review["rating"]
+        group = groups.setdefault(_rollup_key(review, field), [0, 0, rating, rating, {}])
+        group[0] += 1
+        group[1] += rating
+        group[2] = min(group[2], rating)
+        group[3] = max(group[3], rating)
+        group[4][rating] = group[4].get(rating, 0) + 1
+    return groups
+
+
+# Аренды в <reviews>_rollup_state (expires_at - момент истечения, UTC):
+# - {_id: "rebuild", owner, expires_at} - идёт пересчёт
+# - {_id: <uuid>, writer: True, expires_at} - активный писатель
+# Упавший процесс держит блокировку не дольше своей аренды: проверки сравнивают
+# expires_at с текущим временем, TTL-индекс удаляет просроченные документы.
+# Аренда писателя должна перекрывать самую долгую запись (одна пачка add_reviews)
+REBUILD_LEASE_ID = "rebuild"
+WRITER_LEASE_SECONDS = 60
+REBUILD_LEASE_SECONDS = 600
+ROLLUP_LOCK_POLL = 0.05
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+class RollupRebuildInProgress(RuntimeError):
+    """Rollup-коллекции уже пересчитываются (другим процессом)"""
+
 
 class MongoReviews:
-    def __init__(self, connection_string: str = "mongodb://localhost:27017/", 
+    """
+    Отчёты по отзывам. Агрегаты по пользователям и товарам хранятся
+    в rollup-коллекциях <reviews>_by_user / <reviews>_by_product
+    ({_id: ключ, count, sum, min, max, histogram: {"оценка": n}}):
+    - обновляются инкрементально в add_review / add_reviews
+    - пересчитываются целиком rebuild_rollups ($merge) для починки; на время
+      пересчёта запись отзывов блокируется (см. _rollup_writer)
+    - отзыв и его $inc - отдельные записи без транзакции (транзакции требуют
+      replica set): если процесс упал между ними, агрегаты отстают от reviews,
+      и восстанавливает их только rebuild_rollups
+    - отчёты читают готовые документы, а не сканируют reviews; если агрегатов
+      ещё нет (отзывы загружены до них), первый отчёт их построит
+    """
+
+    def __init__(self, connection_string: str = MONGO_URL, 
                  db_name: str = "customer", collection_name: str = "reviews"):
         self.client = MongoClient(connection_string)
-        self.collection = self.client[db_name][collection_name]
+        self.db = self.client[db_name]
+        self.collection = self.db[collection_name]
+        self.rollups = {
+            kind: self.db[f"{collection_name}_by_{kind}"] for kind in ROLLUP_KEYS
+        }
+        self.rollup_state = self.db[f"{collection_name}_rollup_state"]
+        self._rollups_checked = False
+
+    def _rebuild_active(self, now) -> bool:
+        return self.rollup_state.find_one(
+            {"_id": REBUILD_LEASE_ID, "expires_at": {"$gt": now}}, {"_id": 1}
+        ) is not None
+
+    @contextmanager
+    def _rollup_writer(self, timeout: float = 30.0, lease: float = WRITER_LEASE_SECONDS):
+        """
+        Разделяемая блокировка записи: отзыв и его $inc в rollup пишутся, только
+        пока нет пересчёта. Иначе $merge пересчёта затёр бы приращения, сделанные
+        во время него, а удаление устаревших документов - новые ключи.
+        Аренда писателя регистрируется до проверки пересчёта: пересчёт, начатый
+        после проверки, увидит её и дождётся конца записи
+        """
+        lease_id = str(uuid.uuid4())
+        deadline = time.monotonic() + timeout
+        while True:
+            now = _utcnow()
+            self.rollup_state.insert_one(
+                {"_id": lease_id, "writer": True, "expires_at": now + timedelta(seconds=lease)}
+            )
+            if not self._rebuild_active(now):
+                break
+            self.rollup_state.delete_one({"_id": lease_id})
+            if time.monotonic() > deadline:
+                raise TimeoutError("rollup-агрегаты пересчитываются дольше таймаута записи")
+            time.sleep(ROLLUP_LOCK_POLL)
+        try:
+            yield
+        finally:
+            self.rollup_state.delete_one({"_id": lease_id})
+
+    @contextmanager
+    def _rollup_rebuild_lock(self, timeout: float = 2 * WRITER_LEASE_SECONDS, force: bool = False,
+                             lease: float = REBUILD_LEASE_SECONDS):
+        """
+        Исключительная блокировка для пересчёта: новые писатели ждут, активные
+        дописывают (аренды упавших истекают сами). Отдаёт renew() - продление
+        аренды пересчёта. force - забрать ещё не истёкшую аренду пересчёта
+        """
+        self.rollup_state.create_index("expires_at", expireAfterSeconds=0)
+        owner = str(uuid.uuid4())
+        now = _utcnow()
+        lock_filter = {"_id": REBUILD_LEASE_ID}
+        if not force:
+            lock_filter["expires_at"] = {"$lte": now}
+        try:
+            # Истёкшая аренда перехватывается, действующая - DuplicateKeyError на upsert
+            self.rollup_state.update_one(
+                lock_filter,
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=lease)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            raise RollupRebuildInProgress("rollup-агрегаты уже пересчитываются") from None
+
+        def renew():
+            self.rollup_state.update_one(
+                {"_id": REBUILD_LEASE_ID, "owner": owner},
+                {"$set": {"expires_at": _utcnow() + timedelta(seconds=lease)}},
+            )
+
+        try:
+            deadline = time.monotonic() + timeout
+            while self.rollup_state.find_one({"writer": True, "expires_at": {"$gt": _utcnow()}}, {"_id": 1}):
+                if time.monotonic() > deadline:
+                    raise TimeoutError("запись отзывов не завершилась за таймаут")
+                time.sleep(ROLLUP_LOCK_POLL)
+            yield renew
+        finally:
+            self.rollup_state.delete_one({"_id": REBUILD_LEASE_ID, "owner": owner})
+
+    def add_review(self, review: dict):
+        with self._rollup_writer():
+            self.collection.insert_one(review)
+            for kind, field in ROLLUP_KEYS.items():
+                rating = review["rating"]
+                self.rollups[kind].update_one(
+                    {"_id": _rollup_key(review, field)},
+                    _rollup_update(1, rating, rating, rating, {rating: 1}),
+                    upsert=True,
+                )
+
+    def add_reviews(self, reviews: list):
+        """Пачка отзывов: один insert_many и по одному bulk_write на rollup-коллекцию"""
+        with self._rollup_writer():
+            self.collection.insert_many(reviews, ordered=False)
+            for kind, field in ROLLUP_KEYS.items():
+                self.rollups[kind].bulk_write(
+                    [UpdateOne({"_id": key}, _rollup_update(*group), upsert=True)
+                     for key, group in group_reviews(reviews, field).items()],
+                    ordered=False,
+                )
+
+    def ensure_rollups(self):
+        """Пересчитывает агрегаты, если их нет, а отзывы есть (проверка раз на объект)"""
+        if self._rollups_checked:
+            return
+        if (self.collection.estimated_document_count()
+                and not self.rollups["product"].estimated_document_count()):
+            try:
+                self.rebuild_rollups()
+            except RollupRebuildInProgress:
+                # Их уже строит другой процесс
+                return
+        self._rollups_checked = True
 
-    def get_user_report(self):
-        pipeline_by_user = [
+    def rebuild_rollups(self, force: bool = False):
+        """
+        Полный пересчёт rollup-коллекций по reviews через $merge (починка после
+        расхождений, удалений отзывов или массовой загрузки в обход add_reviews).
+        Запись отзывов на это время блокируется - пересчёт точен
+        """
+        with self._rollup_rebuild_lock(force=force) as renew:
+            self._rebuild_rollups(renew)
+        self._rollups_checked = True
+
+    def _rebuild_rollups(self, renew=None):
+        stamp = _utcnow()
+        for kind, field in ROLLUP_KEYS.items():
+            if renew:
+                renew()
+            rollup = self.rollups[kind]
+            self.collection.aggregate([
+                {"$group": {
+                    "_id": {"key": f"${field}", "rating": "$rating"},
+                    "n": {"$sum": 1}
+                }},
+                {"$group": {
+                    "_id": "$_id.key",
+                    "count": {"$sum": "$n"},
+                    "sum": {"$sum": {"$multiply": ["$_id.rating", "$n"]}},
+                    "min": {"$min": "$_id.rating"},
+                    "max": {"$max": "$_id.rating"},
+                    "histogram": {"$push": {"k": {"$toString": "$_id.rating"}, "v": "$n"}}
+                }},
+                {"$set": {"histogram": {"$arrayToObject": "$histogram"}, "rebuilt_at": stamp}},
+                {"$merge": {"into": rollup.name, "whenMatched": "replace", "whenNotMatched": "insert"}}
+            ], allowDiskUse=True)
+            # Ключи, у которых больше нет отзывов, включая документы, созданные
+            # только инкрементально (без rebuilt_at)
+            rollup.delete_many({"rebuilt_at": {"$ne": stamp}})
+        self.rollups["user"].create_index([("count", DESCENDING)])
+
+    def get_user_report(self, limit: int = None, skip: int = 0):
+        """Пользователи по убыванию числа отзывов; limit/skip - страница (top-N при skip=0)"""
+        self.ensure_rollups()
+        cursor = self.rollups["user"].find({}, {"count": 1, "sum": 1}).sort(
+            [("count", DESCENDING), ("_id", ASCENDING)]
+        ).skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [
+            {
+                "_id": rollup["_id"],
+                "total_reviews": rollup["count"],
+                "average_rating": rollup["sum"] / rollup["count"]
+            }
+            for rollup in cursor
+        ]
+
+    def get_product_report_by_product(self, product_id: str):
+        self.ensure_rollups()
+        rollup = self.rollups["product"].find_one({"_id": product_id})
+        if not rollup:
+            return []
+        return [{
+            "_id": rollup["_id"],
+            "total_reviews": rollup["count"],
+            "average_rating": rollup["sum"] / rollup["count"],
+            "min_rating": rollup["min"],
+            "max_rating": rollup["max"],
+            "histogram": rollup["histogram"]
+        }]
+
+    def get_rating_percentiles(self, kind: str, key: str, quantiles=(0.5, 0.9, 0.99)):
+        """
+        Перцентили оценок товара (kind="product") или пользователя (kind="user")
+        по гистограмме из rollup-документа: один find_one, без чтения отзывов.
+        Оценки целые 1..10, поэтому гистограмма - точный и сливаемый "скетч"
+        фиксированного размера (погрешность 0, в отличие от t-digest/KLL)
+        """
+        self.ensure_rollups()
+        rollup = self.rollups[kind].find_one({"_id": key}, {"histogram": 1})
+        if not rollup:
+            return None
+        return {f"p{q * 100:g}": histogram_quantile(rollup["histogram"], q) for q in quantiles}
+
+    def _user_report_pipeline(self, limit=None, skip=0):
+        pipeline = [
+            {"$project": {"_id": 0, "user_id": 1, "rating": 1}},
             {"$group": {
                 "_id": "$user_id",
                 "total_reviews": {"$sum": 1},
                 "average_rating": {"$avg": "$rating"}
             }},
-            {"$sort": {"total_reviews": -1}}
+            # _id - стабильный порядок страниц при равном числе отзывов
+            {"$sort": {"total_reviews": -1, "_id": 1}}
         ]
-        return list(self.collection.aggregate(pipeline_by_user))
+        if skip:
+            pipeline.append({"$skip": skip})
+        if limit:
+            # $sort + $limit объединяются в top-N: в памяти держится только skip + limit групп
+            pipeline.append({"$limit": limit})
+        return pipeline
 
-    def get_product_report_by_product(self, product_id: str):
-        pipeline_specific_product = [
+    def scan_user_report(self, limit: int = None, skip: int = 0):
+        """Точный отчёт полным проходом по reviews (сверка с rollup)"""
+        return list(self.iter_scan_user_report(limit=limit, skip=skip))
+
+    def iter_scan_user_report(self, limit: int = None, skip: int = 0, batch_size: int = 1000):
+        """
+        Генератор точного отчёта: группы читаются с курсора пачками по batch_size,
+        allowDiskUse снимает лимит 100 МБ на стадии $group/$sort
+        """
+        cursor = self.collection.aggregate(
+            self._user_report_pipeline(limit, skip), allowDiskUse=True, batchSize=batch_size
+        )
+        with cursor:
+            yield from cursor
+
+    def _product_report_pipeline(self, product_id):
+        return [
             {"$match": {"order_data.product_id": product_id}},
+            # Только поля индекса (order_data.product_id, rating) и без _id - покрытый запрос
+            {"$project": {"_id": 0, "order_data.product_id": 1, "rating": 1}},
             {"$group": {
                 "_id": "$order_data.product_id",
                 "total_reviews": {"$sum": 1},
@@ -53,9 +461,46 @@ class MongoReviews:
                 "max_rating": {"$max": "$rating"}
             }}
         ]
-        return list(self.collection.aggregate(pipeline_specific_product))
 
-# generate_test_data()
-mongo_reviews = MongoReviews()
-# print(mongo_reviews.get_user_report())
-print(mongo_reviews.get_product_report_by_product("2"))
+    def scan_product_report(self, product_id: str):
+        return list(self.collection.aggregate(
+            self._product_report_pipeline(product_id), allowDiskUse=True
+        ))
+
+    def explain_product_report(self, product_id: str) -> dict:
+        """
+        Проверка плана отчёта по товару: covered - индекс используется
+        (IXSCAN) и документы не читаются (нет FETCH / COLLSCAN)
+        """
+        explain = self.db.command(
+            "aggregate",
+            self.collection.name,
+            pipeline=self._product_report_pipeline(product_id),
+            explain=True,
+        )
+        stages = _winning_plan_stages(explain)
+        return {
+            "stages": stages,
+            "index_used": "IXSCAN" in stages,
+            "covered": "IXSCAN" in stages and not {"FETCH", "COLLSCAN"} & set(stages),
+        }
+
+if __name__ == "__main__":
+    # Под __main__: процессы пула импортируют модуль заново
+    parser = argparse.ArgumentParser(description="Отчёты по отзывам / генерация тестовых данных")
+    parser.add_argument("--generate", type=int, metavar="COUNT", help="сгенерировать COUNT отзывов")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--upsert", action="store_true", help="bulk_write ReplaceOne(upsert) без drop")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_test_data(args.generate, batch_size=args.batch_size, workers=args.workers,
+                           seed=args.seed, users=args.users, products=args.products,
+                           drop=not args.upsert, upsert=args.upsert)
+    mongo_reviews = MongoReviews()
+    # print(mongo_reviews.get_user_report())
+    print(mongo_reviews.get_product_report_by_product("2"))
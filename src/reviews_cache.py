@@ -0,0 +1,229 @@
+"""
+Кеш отчётов MongoReviews в Redis с точной инвалидацией по change stream.
+
+- чтение по схеме redis_expl.get_cached: GET -> иначе вычислить и SETEX с TTL;
+  SETEX выполняется, только если за время вычисления ключ не инвалидировали
+  (поколение ключа <key>:gen и общая эпоха под WATCH) - иначе устаревшее
+  значение записалось бы обратно и жило бы до TTL
+- ReportsInvalidator слушает change stream rollup-коллекций (источник отчётов,
+  см. MongoReviews.rebuild_rollups) и удаляет ключи изменившихся товаров/пользователей;
+  TTL остаётся страховкой на случай пропущенных событий
+- токен возобновления хранится в Redis: после перезапуска поток продолжает
+  с места остановки, при невозможности возобновить кеш сбрасывается целиком
+
+Change stream требует replica set (локально - одноузловой, см. compose.yaml):
+    python reviews_cache.py --mongo "mongodb://localhost:27017/?directConnection=true"
+"""
+import argparse
+import json
+import threading
+import time
+
+import redis
+from pymongo.errors import PyMongoError
+
+from mongodb_review import MONGO_URL, MongoReviews
+
+PREFIX = "reviews"
+USERS_VERSION_KEY = f"{PREFIX}:users:version"
+RESUME_TOKEN_KEY = f"{PREFIX}:resume_token"
+# Увеличивается при полном сбросе кеша
+EPOCH_KEY = f"{PREFIX}:epoch"
+
+
+def generation_key(key):
+    return f"{key}:gen"
+
+
+def product_key(product_id):
+    return f"{PREFIX}:product:{product_id}"
+
+
+def percentiles_key(kind, key):
+    return f"{PREFIX}:percentiles:{kind}:{key}"
+
+
+class CachedMongoReviews:
+    """
+    Те же отчёты, что у MongoReviews, с кешем в Redis.
+    Отчёт по пользователям зависит от всех пользователей сразу - его ключ
+    содержит версию, которую инвалидатор увеличивает при любом изменении
+    """
+
+    def __init__(self, reviews: MongoReviews, client: redis.Redis, ttl: int = 300):
+        self.reviews = reviews
+        self.r = client
+        self.ttl = ttl
+
+    def get_cached(self, key, compute, ttl=None):
+        """Получает из кеша или вычисляет с TTL (значения в JSON)"""
+        cached = self.r.get(key)
+        if cached is not None:
+            return json.loads(cached)
+        guard = (generation_key(key), EPOCH_KEY)
+        before = self.r.mget(guard)
+        value = compute()
+        self._store_if_unchanged(key, guard, before, json.dumps(value), ttl or self.ttl)
+        return value
+
+    def _store_if_unchanged(self, key, guard, before, data, ttl):
+        """SETEX, только если поколение ключа и эпоха не менялись с начала вычисления"""
+        with self.r.pipeline() as pipe:
+            try:
+                pipe.watch(*guard)
+                if pipe.mget(guard) != before:
+                    return False
+                pipe.multi()
+                pipe.setex(key, ttl, data)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                # Инвалидация пришла между проверкой и записью
+                return False
+
+    def get_product_report_by_product(self, product_id: str):
+        return self.get_cached(
+            product_key(product_id),
+            lambda: self.reviews.get_product_report_by_product(product_id),
+        )
+
+    def get_user_report(self, limit: int = None, skip: int = 0):
+        version = int(self.r.get(USERS_VERSION_KEY) or 0)
+        return self.get_cached(
+            f"{PREFIX}:users:{version}:{limit}:{skip}",
+            lambda: self.reviews.get_user_report(limit=limit, skip=skip),
+        )
+
+    def get_rating_percentiles(self, kind: str, key: str):
+        return self.get_cached(
+            percentiles_key(kind, key),
+            lambda: self.reviews.get_rating_percentiles(kind, key),
+        )
+
+    def invalidate(self, kind: str, key: str):
+        """
+        Удаляет отчёты товара/пользователя; один round-trip через pipeline.
+        Поколение увеличивается до удаления: вычисление, начатое раньше, не запишет результат
+        """
+        keys = [percentiles_key(kind, key)]
+        if kind == "product":
+            keys.append(product_key(key))
+        pipe = self.r.pipeline(transaction=False)
+        for cache_key in keys:
+            pipe.incr(generation_key(cache_key))
+            pipe.delete(cache_key)
+        if kind == "user":
+            # Ключ отчёта по пользователям содержит версию; старые истекут по TTL
+            pipe.incr(USERS_VERSION_KEY)
+        pipe.execute()
+
+    def clear(self):
+        """Полный сброс (пропущены события change stream)"""
+        self.r.incr(EPOCH_KEY)
+        keep = {RESUME_TOKEN_KEY, EPOCH_KEY}
+        for key in self.r.scan_iter(f"{PREFIX}:*", count=1000):
+            name = key.decode() if isinstance(key, bytes) else key
+            # Поколения не удаляем: сброс в None совпал бы с прочитанным до вычисления
+            if name not in keep and not name.endswith(":gen"):
+                self.r.delete(key)
+        self.r.incr(USERS_VERSION_KEY)
+
+
+class ReportsInvalidator:
+    """Фоновый поток: change stream rollup-коллекций -> invalidate"""
+
+    def __init__(self, cache: CachedMongoReviews, retry_delay: float = 1.0):
+        self.cache = cache
+        self.retry_delay = retry_delay
+        # Коллекция rollup -> вид отчёта
+        self.kinds = {collection.name: kind for kind, collection in cache.reviews.rollups.items()}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load_resume_token(self):
+        token = self.cache.r.get(RESUME_TOKEN_KEY)
+        return json.loads(token) if token else None
+
+    def _save_resume_token(self, token):
+        self.cache.r.set(RESUME_TOKEN_KEY, json.dumps(token))
+
+    def handle(self, change):
+        kind = self.kinds.get(change["ns"]["coll"])
+        if kind is None:
+            return
+        if change["operationType"] in ("drop", "rename", "dropDatabase", "invalidate"):
+            self.cache.clear()
+        else:
+            self.cache.invalidate(kind, change["documentKey"]["_id"])
+
+    def _watch(self):
+        db = self.cache.reviews.db
+        pipeline = [{"$match": {"ns.coll": {"$in": list(self.kinds)}}}]
+        resume_token = self._load_resume_token()
+        if resume_token is None:
+            # Неизвестно, что менялось до запуска
+            self.cache.clear()
+        try:
+            stream = db.watch(pipeline, resume_after=resume_token, max_await_time_ms=500)
+        except PyMongoError:
+            if resume_token is None:
+                raise
+            # Токен устарел (oplog перезаписан) - события потеряны
+            self.cache.r.delete(RESUME_TOKEN_KEY)
+            self.cache.clear()
+            stream = db.watch(pipeline, max_await_time_ms=500)
+        with stream:
+            # try_next ждёт не дольше max_await_time_ms - stop() срабатывает быстро
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    self.handle(change)
+                if stream.resume_token is not None and stream.resume_token != resume_token:
+                    resume_token = stream.resume_token
+                    self._save_resume_token(resume_token)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._watch()
+            except (PyMongoError, redis.RedisError) as e:
+                print(f"Change stream прерван: {e}, повтор через {self.retry_delay} с")
+                self._stop.wait(self.retry_delay)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Кеш отчётов по отзывам с инвалидацией по change stream")
+    parser.add_argument("--mongo", default=MONGO_URL)
+    parser.add_argument("--redis", default="redis://localhost:6379/0")
+    parser.add_argument("--product", default="2")
+    args = parser.parse_args()
+
+    cache = CachedMongoReviews(MongoReviews(args.mongo), redis.Redis.from_url(args.redis))
+    invalidator = ReportsInvalidator(cache)
+    invalidator.start()
+    time.sleep(1)
+    try:
+        print("Из MongoDB:", cache.get_product_report_by_product(args.product))
+        print("Из кеша:   ", cache.get_product_report_by_product(args.product))
+        cache.reviews.add_review({
+            "user_id": "1",
+            "order_data": {"order_id": "cache-demo", "product_id": args.product},
+            "rating": 10,
+            "content": "some text"
+        })
+        time.sleep(1)
+        print("После отзыва:", cache.get_product_report_by_product(args.product))
+    finally:
+        invalidator.stop()
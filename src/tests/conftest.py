@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Скрипты src/*.py импортируются как модули верхнего уровня
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,66 @@
+from datetime import datetime
+import pytest
+from bulk_load import NULL, TABLES, CopyStream, _task_defaults, bulk_load
+
+
+def encode(rows, columns, **kwargs):
+    stream = CopyStream(rows, columns, **kwargs)
+    return "".join(iter(lambda: stream.read(7), "")), stream
+
+
+def test_copy_stream_escaping():
+    # COPY ... (FORMAT csv): всё в кавычках, None - \N без кавычек
+    data, stream = encode(
+        [("a\tb", "line1\nline2", "back\\slash", None, NULL, 'say "hi"', 5)],
+        ("a", "b", "c", "d", "e", "f", "g"),
+    )
+    assert data == '"a\tb","line1\nline2","back\\slash",\\N,"\\N","say ""hi""","5"\n'
+    assert stream.rows_written == 1
+
+
+def test_copy_stream_dict_rows_and_buffering():
+    rows = [{"name": f"user {n}", "email": f"u{n}@example.com"} for n in range(5)]
+    progress = []
+    data, stream = encode(
+        rows, ("name", "email", "age"), buffer_rows=2, progress=progress.append, progress_every=2
+    )
+    assert data.splitlines() == [f'"user {n}","u{n}@example.com",\\N' for n in range(5)]
+    assert stream.rows_written == 5
+    assert progress == [2, 4]
+
+
+def test_copy_stream_tracks_column():
+    spec = TABLES["tasks"]
+    rows = [("t1", None, "done", 1, None, None), ("t2", None, None, 2, None, None), ("t3", None, None, 1, None, None)]
+    data, stream = encode(rows, spec["columns"], prepare=spec["prepare"], track=spec["versioned_by"])
+    assert stream.tracked == {1, 2}
+    assert data.count("\n") == 3
+
+
+def test_task_defaults():
+    created = datetime(2026, 1, 2, 3, 4, 5)
+    row = _task_defaults({"title": "t", "status": "in progress", "created_at": created})
+    assert row["status"] == "in_progress"
+    assert row["updated_at"] == created
+
+    row = _task_defaults({"title": "t"})
+    assert row["status"] == "new"
+    assert isinstance(row["created_at"], datetime)
+    assert row["updated_at"] == row["created_at"]
+
+    # Уже имя члена Enum - без изменений
+    assert _task_defaults({"status": "in_progress"})["status"] == "in_progress"
+
+
+@pytest.mark.parametrize("table, kwargs", [
+    # id генерируется при вставке: без него ключ (id, created_at) не сработает
+    ("tasks", {}),
+    # у posts нет естественного ключа по умолчанию
+    ("posts", {}),
+    ("users", {"columns": ["name", "age"]}),
+    ("no_such_table", {}),
+])
+def test_staging_requires_loaded_conflict_key(table, kwargs):
+    # Проверка до обращения к соединению
+    with pytest.raises(ValueError):
+        bulk_load(None, table, [], staging=True, **kwargs)
@@ -0,0 +1,95 @@
+import time
+import pytest
+from HW_6.counter import BatchedCounter
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FailingPipeline:
+    """Pipeline, у которого execute падает, как при недоступном Redis"""
+
+    def __init__(self, pipe):
+        self._pipe = pipe
+
+    def __getattr__(self, name):
+        return getattr(self._pipe, name)
+
+    def execute(self):
+        raise ConnectionError("redis down")
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeRedis()
+
+
+def test_incr_buffers_until_flush_size(redis):
+    counter = BatchedCounter(redis, "visits", flush_size=3)
+    assert counter.incr() == 1
+    assert counter.incr() == 2
+    assert redis.get("visits") is None
+    # Третье приращение достигает flush_size: без потока отправка в вызывающем
+    assert counter.incr() == 3
+    assert int(redis.get("visits")) == 3
+    assert counter.value() == 3
+
+
+def test_shards_round_robin_and_summed(redis):
+    counter = BatchedCounter(redis, "visits", shards=3, flush_size=1)
+    redis.set("visits:0", 10)  # приращения других процессов
+    for _ in range(6):
+        counter.incr()
+    assert sorted(int(redis.get(f"visits:{n}")) for n in range(3)) == [2, 2, 12]
+    assert counter.value() == 16
+    assert redis.get("visits") is None
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_background_flush_on_interval(redis):
+    counter = BatchedCounter(redis, "visits", flush_interval=0.01, flush_size=1000)
+    counter.start()
+    try:
+        counter.incr(5)
+        assert wait_for(lambda: redis.get("visits") == b"5")
+    finally:
+        counter.stop()
+
+
+def test_background_flush_woken_by_size(redis):
+    # Интервал большой: отправку запускает только достижение flush_size
+    counter = BatchedCounter(redis, "visits", flush_interval=60, flush_size=2)
+    counter.start()
+    try:
+        counter.incr()
+        counter.incr()
+        assert wait_for(lambda: redis.get("visits") == b"2")
+    finally:
+        counter.stop()
+
+
+def test_stop_flushes_pending(redis):
+    counter = BatchedCounter(redis, "visits", flush_interval=60, flush_size=1000)
+    counter.start()
+    counter.incr(7)
+    counter.stop()
+    assert int(redis.get("visits")) == 7
+
+
+def test_failed_flush_keeps_pending(redis):
+    counter = BatchedCounter(redis, "visits", flush_size=1)
+    pipeline = redis.pipeline
+    redis.pipeline = lambda **kwargs: FailingPipeline(pipeline(**kwargs))
+    counter.incr(4)  # ошибка отправки не пробрасывается из incr
+    assert counter.value() == 4
+    assert redis.get("visits") is None
+
+    redis.pipeline = pipeline
+    counter.flush()
+    assert int(redis.get("visits")) == 4
+    assert counter.value() == 4
@@ -0,0 +1,99 @@
+import os
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.exc import IntegrityError
+
+# main.py создаёт таблицу при импорте: до импорта - SQLite вместо PostgreSQL
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+import main
+
+PAGE_SIZE = 50
+
+
+@pytest.fixture
+def statements(tmp_path, monkeypatch):
+    """main.engine на своей SQLite; возвращает список (executemany, SQL) выполненных запросов"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}", insertmanyvalues_page_size=PAGE_SIZE)
+    main.metadata.create_all(engine)
+    executed = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((executemany, statement.split()[0].upper()))
+
+    monkeypatch.setattr(main, "engine", engine)
+    yield executed
+    engine.dispose()
+
+
+def users(count, start=0):
+    return [{"name": f"user {n}", "email": f"user{n}@example.com", "age": n % 90} for n in range(start, start + count)]
+
+
+def count_users():
+    with main.engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(main.user_table)).scalar()
+
+
+def test_create_users_bulk_batches(statements):
+    ids = main.create_users_bulk(users(120))
+    assert len(ids) == 120
+    # id в порядке входных строк
+    assert ids == sorted(ids)
+    inserts = [sql for _, sql in statements if sql == "INSERT"]
+    if main.engine.dialect.name == "postgresql":
+        # 120 строк - три multi-VALUES INSERT по PAGE_SIZE
+        assert len(inserts) == 3
+    else:
+        # SQLite не гарантирует порядок RETURNING у multi-VALUES, и при
+        # sort_by_parameter_order SQLAlchemy отправляет строки по одной
+        assert len(inserts) == 120
+    assert count_users() == 120
+
+
+def test_read_update_delete_bulk(statements):
+    ids = main.create_users_bulk(users(100))
+    statements.clear()
+
+    rows = main.read_users_by_ids(ids[:10] + [10_000])
+    assert [row.id for row in rows] == ids[:10]
+
+    updates = [{"id": user_id, "age": 1} for user_id in ids[:30]]
+    updates += [{"id": user_id, "name": "renamed", "age": 2} for user_id in ids[30:40]]
+    updates.append({"id": ids[50]})  # нечего обновлять - пропускается
+    assert main.update_users_bulk(updates) == 40
+
+    assert main.delete_users_bulk(ids[:25] + [10_000]) == 25
+    # SELECT, по одному executemany на группу полей, один DELETE
+    assert statements == [(False, "SELECT"), (True, "UPDATE"), (True, "UPDATE"), (False, "DELETE")]
+    assert count_users() == 75
+    rows = main.read_users_by_ids(ids[25:40])
+    assert [row.age for row in rows] == [1] * 5 + [2] * 10
+    assert {row.name for row in rows[5:]} == {"renamed"}
+
+
+def test_bulk_on_caller_connection(statements):
+    with main.engine.connect() as conn:
+        with conn.begin() as transaction:
+            ids = main.create_users_bulk(users(5), conn=conn)
+            assert main.delete_users_bulk(ids[:2], conn=conn) == 2
+            transaction.rollback()
+    assert count_users() == 0
+
+    main.create_users_bulk(users(1))
+    # С соединением вызывающего кода ошибка пробрасывается: откатывает он
+    with main.engine.connect() as conn:
+        with pytest.raises(IntegrityError):
+            with conn.begin():
+                main.create_users_bulk(users(1), conn=conn)
+    # Без соединения - печать ошибки и пустой результат
+    assert main.create_users_bulk(users(1)) == []
+    assert count_users() == 1
+
+
+def test_empty_input(statements):
+    assert main.create_users_bulk([]) == []
+    assert main.read_users_by_ids([]) == []
+    assert main.update_users_bulk([]) == 0
+    assert main.delete_users_bulk([]) == 0
+    assert statements == []
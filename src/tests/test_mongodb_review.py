@@ -0,0 +1,155 @@
+import math
+import pytest
+from mongodb_review import _rollup_update, build_reviews, group_reviews, histogram_quantile
+
+def test_rollup_update_single_review():
+    assert _rollup_update(1, 7, 7, 7, {7: 1}) == {
+        "$inc": {"count": 1, "sum": 7, "histogram.7": 1},
+        "$min": {"min": 7},
+        "$max": {"max": 7},
+    }
+
+def test_group_reviews_matches_rollup_fields():
+    reviews = [
+        {"user_id": "1", "order_data": {"product_id": "a"}, "rating": 3},
+        {"user_id": "2", "order_data": {"product_id": "a"}, "rating": 9},
+        {"user_id": "1", "order_data": {"product_id": "b"}, "rating": 3},
+    ]
+    groups = group_reviews(reviews, "order_data.product_id")
+    assert groups == {"a": [2, 12, 3, 9, {3: 1, 9: 1}], "b": [1, 3, 3, 3, {3: 1}]}
+    update = _rollup_update(*groups["a"])
+    assert update["$inc"] == {"count": 2, "sum": 12, "histogram.3": 1, "histogram.9": 1}
+    assert update["$min"] == {"min": 3} and update["$max"] == {"max": 9}
+
+def test_group_reviews_totals():
+    reviews = build_reviews(0, 500, seed=1)
+    groups = group_reviews(reviews, "user_id")
+    assert sum(group[0] for group in groups.values()) == 500
+    assert sum(group[1] for group in groups.values()) == sum(r["rating"] for r in reviews)
+    for count, _, _, _, histogram in groups.values():
+        assert sum(histogram.values()) == count
+
+@pytest.mark.parametrize("q, expected", [(0.0, 1), (0.25, 1), (0.5, 2), (0.9, 10), (1.0, 10)])
+def test_histogram_quantile_nearest_rank(q, expected):
+    # Оценки 1, 1, 2, 2, 2, 10 - ключи как в Mongo (строки)
+    assert histogram_quantile({"1": 2, "2": 3, "10": 1}, q) == expected
+
+def test_histogram_quantile_matches_sorted_ratings():
+    ratings = [review["rating"] for review in build_reviews(0, 1000, seed=7)]
+    histogram = {}
+    for rating in ratings:
+        histogram[str(rating)] = histogram.get(str(rating), 0) + 1
+    ratings.sort()
+    for q in (0.01, 0.5, 0.9, 0.99):
+        rank = max(1, math.ceil(q * len(ratings)))
+        assert histogram_quantile(histogram, q) == ratings[rank - 1]
+
+def test_histogram_quantile_empty():
+    assert histogram_quantile({}, 0.5) is None
+    assert histogram_quantile({"5": 0}, 0.5) is None
+
+
+# Блокировки rollup и восстановление агрегатов - на mongomock (без сервера MongoDB)
+
+class MergingCollection:
+    """Обёртка коллекции mongomock: финальную стадию $merge выполняет сама (в mongomock её нет)"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def aggregate(self, pipeline, **kwargs):
+        if not pipeline or "$merge" not in pipeline[-1]:
+            return self._collection.aggregate(pipeline)
+        target = self._collection.database[pipeline[-1]["$merge"]["into"]]
+        for document in self._collection.aggregate(pipeline[:-1]):
+            target.replace_one({"_id": document["_id"]}, document, upsert=True)
+        return iter(())
+
+
+@pytest.fixture
+def reviews(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    import mongodb_review
+    monkeypatch.setattr(mongodb_review, "MongoClient", mongomock.MongoClient)
+    monkeypatch.setattr(mongodb_review, "ROLLUP_LOCK_POLL", 0.001)
+    client = mongodb_review.MongoReviews("mongodb://test", db_name="test")
+    client.collection = MergingCollection(client.collection)
+    return client
+
+
+def lease(reviews, _id, seconds, **fields):
+    from mongodb_review import _utcnow
+    from datetime import timedelta
+    reviews.rollup_state.insert_one({"_id": _id, "expires_at": _utcnow() + timedelta(seconds=seconds), **fields})
+
+
+def product_counts(reviews):
+    return {doc["_id"]: doc["count"] for doc in reviews.rollups["product"].find()}
+
+
+def add_reviews(reviews, batch):
+    # По одному: bulk_write UpdateOne текущего pymongo mongomock не поддерживает
+    for review in batch:
+        reviews.add_review(review)
+
+
+def test_writer_lease_released(reviews):
+    add_reviews(reviews, build_reviews(0, 20, seed=1))
+    assert reviews.rollup_state.count_documents({}) == 0
+    assert sum(product_counts(reviews).values()) == 20
+
+
+def test_writer_waits_for_active_rebuild(reviews):
+    with reviews._rollup_rebuild_lock():
+        with pytest.raises(TimeoutError):
+            with reviews._rollup_writer(timeout=0.01):
+                pass
+    # Отступивший писатель не оставил аренды
+    assert reviews.rollup_state.count_documents({"writer": True}) == 0
+    with reviews._rollup_writer(timeout=0.01):
+        pass
+
+
+def test_crashed_writer_lease_expires(reviews):
+    # Писатель упал внутри _rollup_writer: его аренда истекла - пересчёт не ждёт
+    lease(reviews, "crashed", -1, writer=True)
+    reviews.rebuild_rollups()
+    # Живая аренда задерживает пересчёт до таймаута
+    lease(reviews, "active", 60, writer=True)
+    with pytest.raises(TimeoutError):
+        with reviews._rollup_rebuild_lock(timeout=0.01):
+            pass
+
+
+def test_rebuild_lease_expiry_and_force(reviews):
+    from mongodb_review import REBUILD_LEASE_ID, RollupRebuildInProgress
+    lease(reviews, REBUILD_LEASE_ID, 60, owner="other")
+    with pytest.raises(RollupRebuildInProgress):
+        reviews.rebuild_rollups()
+    reviews.rebuild_rollups(force=True)
+    assert reviews.rollup_state.count_documents({"_id": REBUILD_LEASE_ID}) == 0
+
+    # Аренда упавшего пересчёта истекла - перехватывается без force
+    lease(reviews, REBUILD_LEASE_ID, -1, owner="crashed")
+    reviews.rebuild_rollups()
+
+
+def test_rebuild_recovers_crash_between_insert_and_rollup(reviews):
+    add_reviews(reviews, build_reviews(0, 50, seed=2))
+    # Падение после insert_one, до $inc в rollup: агрегаты отстают от reviews
+    lost = build_reviews(1, 3, seed=2)
+    reviews.collection.insert_many(lost)
+    assert sum(product_counts(reviews).values()) == 50
+
+    reviews.rebuild_rollups()
+    everything = list(reviews.collection.find())
+    expected = {}
+    for review in everything:
+        key = review["order_data"]["product_id"]
+        expected[key] = expected.get(key, 0) + 1
+    assert product_counts(reviews) == expected
+    totals = {row["_id"]: row["total_reviews"] for row in reviews.get_user_report()}
+    assert sum(totals.values()) == 53
@@ -0,0 +1,69 @@
+import pytest
+from reviews_cache import CachedMongoReviews, ReportsInvalidator, product_key
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeReviews:
+    """Отчёты MongoReviews без MongoDB: считает вычисления, on_compute - хук «во время» запроса"""
+
+    def __init__(self):
+        self.rating = 5
+        self.computed = 0
+        self.on_compute = None
+        self.rollups = {"user": type("C", (), {"name": "reviews_by_user"})(),
+                        "product": type("C", (), {"name": "reviews_by_product"})()}
+
+    def get_product_report_by_product(self, product_id):
+        self.computed += 1
+        report = [{"_id": product_id, "average_rating": self.rating}]
+        if self.on_compute:
+            self.on_compute()
+        return report
+
+
+@pytest.fixture
+def cache():
+    return CachedMongoReviews(FakeReviews(), fakeredis.FakeRedis(), ttl=60)
+
+
+def test_miss_then_hit(cache):
+    assert cache.get_product_report_by_product("1")[0]["average_rating"] == 5
+    assert cache.get_product_report_by_product("1")[0]["average_rating"] == 5
+    assert cache.reviews.computed == 1
+    assert cache.r.ttl(product_key("1")) > 0
+
+
+def test_invalidation_recomputes(cache):
+    cache.get_product_report_by_product("1")
+    cache.reviews.rating = 9
+    cache.invalidate("product", "1")
+    assert cache.get_product_report_by_product("1")[0]["average_rating"] == 9
+    assert cache.reviews.computed == 2
+
+
+def test_invalidation_during_compute_not_written_back(cache):
+    # Отзыв пришёл, пока отчёт считался: старое значение не должно попасть в кеш
+    def new_review_arrives():
+        cache.reviews.on_compute = None
+        cache.reviews.rating = 9
+        cache.invalidate("product", "1")
+
+    cache.reviews.on_compute = new_review_arrives
+    assert cache.get_product_report_by_product("1")[0]["average_rating"] == 5
+    assert cache.r.get(product_key("1")) is None
+    assert cache.get_product_report_by_product("1")[0]["average_rating"] == 9
+
+
+def test_clear_during_compute_not_written_back(cache):
+    cache.reviews.on_compute = cache.clear
+    cache.get_product_report_by_product("1")
+    assert cache.r.get(product_key("1")) is None
+
+
+def test_change_stream_event_invalidates(cache):
+    cache.get_product_report_by_product("1")
+    invalidator = ReportsInvalidator(cache)
+    invalidator.handle({"ns": {"coll": "reviews_by_product"}, "operationType": "update",
+                        "documentKey": {"_id": "1"}})
+    assert cache.r.get(product_key("1")) is None